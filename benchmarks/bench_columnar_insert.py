@@ -0,0 +1,63 @@
+'''
+Compares insert_into(data_dict=...) when the columns are first materialized into a 
+list of tuples (the old _dict_to_tuple_list loop) against the lazy columnar path.
+
+usage: python benchmarks/bench_columnar_insert.py [rows] [columns]
+defaults to 1,000,000 rows x 20 columns
+'''
+import os
+import sys
+import time
+from array import array
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+from sqlite_db.sqlite_script import Sqlite_Connection
+from templates import query_string as qs
+
+
+def materialized_rows(data):
+	'''the row building loop insert_into used before the columnar path'''
+	fields = tuple(data.keys())
+	all_data = []
+	for row in range(len(data[fields[0]])):
+		row_data = []
+		for field in fields:
+			row_data.append(data[field][row])
+		all_data.append(tuple(row_data))
+	return fields, all_data
+
+
+def make_columns(rows, columns, kind):
+	if kind == 'array':
+		return {f'c{i}':array('q', range(rows)) for i in range(columns)}
+	return {f'c{i}':list(range(rows)) for i in range(columns)}
+
+
+def run(conn, table, data_dict, columnar):
+	conn.cur.execute(f'DELETE FROM {table}')
+	start = time.perf_counter()
+	if columnar:
+		conn.insert_into(table, data_dict=data_dict)
+	else:
+		fields, data = materialized_rows(data_dict)
+		conn.cur.executemany(qs.insert_into(table, fields), data)
+	conn.conn.commit()
+	return time.perf_counter() - start
+
+
+def main(rows=1000000, columns=20):
+	results = {}
+	with Sqlite_Connection(':memory:') as conn:
+		conn.create_table('bench', [(f'c{i}', 'INTEGER') for i in range(columns)])
+		for kind in ('list', 'array'):
+			data_dict = make_columns(rows, columns, kind)
+			for columnar in (False, True):
+				name = f'{kind} {"columnar" if columnar else "materialized"}'
+				seconds = run(conn, 'bench', data_dict, columnar)
+				results[name] = rows / seconds
+				print(f'{name:<24}{seconds:8.2f} s {rows / seconds:12,.0f} rows/s')
+	return results
+
+
+if __name__ == '__main__':
+	main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,50 @@
+'''
+Measures the cold start cost of templates.query_string in fresh interpreters.
+
+lazy: import templates.query_string (jinja2 is not loaded)
+eager: import templates.query_string and build the jinja2 Environment, 
+       which is what every import used to pay for
+first_render: import and render one select with the jinja engine
+
+usage: python benchmarks/bench_import.py [runs]
+'''
+import os
+import sys
+import subprocess
+import statistics
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+	'lazy':'import templates.query_string as qs',
+	'eager':'import templates.query_string as qs; qs.env',
+	'first_render':"import templates.query_string as qs; qs.select('t', ('id',), engine='jinja')",
+}
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+'''
+
+
+def time_scenario(code, runs):
+	times = []
+	for _ in range(runs):
+		out = subprocess.run([sys.executable, '-c', TIMER.format(code=code)], cwd=PATH, 
+							check=True, capture_output=True, text=True).stdout
+		times.append(float(out))
+	return statistics.median(times)
+
+
+def main(runs=15):
+	results = {name:time_scenario(code, runs) for name, code in SCENARIOS.items()}
+	for name, seconds in results.items():
+		print(f'{name:<14}{seconds * 1000:8.2f} ms')
+	saved = results['eager'] - results['lazy']
+	print(f'import is {saved * 1000:.2f} ms faster ({saved / results["eager"]:.0%}) when jinja2 is deferred')
+	return results
+
+
+if __name__ == '__main__':
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 15)
@@ -0,0 +1,56 @@
+'''
+Memory per row of the ways a Sqlite_Connection result can be kept in memory.
+
+tuple, row, slots: list(conn.select(...)) with each row_factory
+dict: the tuples converted to {field: value} dicts
+columns: conn.select_columns(...), one array.array or list per column
+
+Each result is measured with tracemalloc while it is alive,
+so the numbers include the values (ints, floats, strings) themselves.
+
+usage: python benchmarks/bench_rows.py [rows]
+defaults to 200,000 rows
+'''
+import os
+import sys
+import time
+import tracemalloc
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+from sqlite_db.sqlite_script import Sqlite_Connection
+
+FIELDS = ('id', 'age', 'score', 'name')
+
+
+def measure(load):
+	'''(bytes held by the result of load(), seconds it took)'''
+	tracemalloc.start()
+	start = time.perf_counter()
+	result = load()
+	seconds = time.perf_counter() - start
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	del result
+	return size, seconds
+
+
+def main(rows=200000):
+	with Sqlite_Connection(':memory:') as conn:
+		conn.cur.execute('CREATE TABLE test (id INTEGER, age INTEGER, score REAL, name TEXT);')
+		conn.insert_into('test', FIELDS, [(i, i % 100, i / 3, f'name_{i}') for i in range(rows)])
+		loads = {}
+		for factory in ('tuple', 'row', 'slots'):
+			loads[factory] = lambda factory=factory: (conn.set_row_factory(factory), list(conn.select('test', FIELDS)))
+		loads['dict'] = lambda: (conn.set_row_factory('tuple'), 
+								[dict(zip(FIELDS, row)) for row in conn.select('test', FIELDS)])
+		loads['columns'] = lambda: conn.select_columns('test', FIELDS)
+		results = {}
+		for name, load in loads.items():
+			size, seconds = measure(load)
+			results[name] = {'bytes_per_row':size / rows, 'seconds':seconds}
+			print(f'{name:<8}{size / rows:8.1f} bytes/row {seconds:8.3f} s')
+	return results
+
+
+if __name__ == '__main__':
+	main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,170 @@
+'''
+Benchmark suite for query generation and the sqlite I/O paths.
+
+build/*: microseconds per call of each query_string builder, for every engine,
+		 with the query cache disabled (render) and warm (cached)
+insert/*: rows per second of Sqlite_Connection.insert_into with a list of tuples, a data_dict,
+		  a list of tuples packed into multi row statements or upserted into a table that
+		  already holds half of them
+read/*: microseconds per call of all_tables and db_fields
+
+usage:
+	python benchmarks/bench_suite.py --output results.json
+	python benchmarks/bench_suite.py --baseline results.json --threshold 0.1
+
+With --baseline every case is compared to the saved results and the script exits with 1
+when any case is more than threshold slower.
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import sqlite3
+import platform
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+from sqlite_db.sqlite_script import Sqlite_Connection
+from templates import query_string as qs
+
+SIZES = (1000, 100000, 1000000)
+
+BUILDERS = {
+	'select':lambda engine: qs.select('test', ('id', 'age', 'name'), ('age', 'name'), operator=('>', 'LIKE'),
+										order_by=('age',), order=('DESC',), limit={'limit':5, 'offset':10},
+										engine=engine),
+	'insert_into':lambda engine: qs.insert_into('test', ('id', 'age', 'name'), engine=engine),
+	'update_table':lambda engine: qs.update_table('test', ('age', 'name'), 'id', engine=engine),
+	'create_table':lambda engine: qs.create_table('test', [{'field':'id', 'data_type':'INTEGER', 'extra':'PRIMARY KEY'},
+															{'field':'age', 'data_type':'INTEGER'},
+															{'field':'name', 'data_type':'TEXT'}], engine=engine),
+}
+
+
+def per_call(f, min_time=0.2):
+	'''microseconds per call of f, repeated for at least min_time seconds'''
+	calls, start = 0, time.perf_counter()
+	while True:
+		for _ in range(100):
+			f()
+		calls += 100
+		elapsed = time.perf_counter() - start
+		if elapsed >= min_time:
+			return elapsed / calls * 1e6
+
+
+def bench_build():
+	results = {}
+	for name, build in BUILDERS.items():
+		for engine in qs.ENGINES:
+			qs.set_cache_size(0)
+			results[f'build/{name}/{engine}/render'] = {'us_per_call':per_call(lambda: build(engine))}
+			qs.set_cache_size(qs.CACHE_SIZE)
+			build(engine)
+			results[f'build/{name}/{engine}/cached'] = {'us_per_call':per_call(lambda: build(engine))}
+	qs.cache_clear()
+	return results
+
+
+def bench_insert(sizes):
+	results = {}
+	fields = ('id', 'age', 'name')
+	for size in sizes:
+		rows = [(i, i % 100, f'name_{i}') for i in range(size)]
+		data_dict = {'id':list(range(size)), 'age':[i % 100 for i in range(size)],
+					'name':[f'name_{i}' for i in range(size)]}
+		for kind in ('tuples', 'data_dict', 'multi_row', 'upsert'):
+			with Sqlite_Connection(':memory:') as conn:
+				#upserts need a key to conflict on
+				key = ('PRIMARY KEY',) if kind == 'upsert' else ()
+				conn.create_table('test', [('id', 'INTEGER') + key, ('age', 'INTEGER'), ('name', 'TEXT')])
+				if kind == 'upsert':
+					conn.insert_into('test', fields, rows[::2])
+					conn.conn.commit()
+				start = time.perf_counter()
+				if kind == 'tuples':
+					conn.insert_into('test', fields, rows)
+				elif kind == 'multi_row':
+					conn.insert_into('test', fields, rows, multi_row=True)
+				elif kind == 'upsert':
+					conn.insert_into('test', fields, rows, on_conflict=('id',), update_fields=('age', 'name'))
+				else:
+					conn.insert_into('test', data_dict=data_dict)
+				conn.conn.commit()
+				seconds = time.perf_counter() - start
+			results[f'insert/{kind}/{size}'] = {'rows_per_sec':size / seconds, 'seconds':seconds}
+	return results
+
+
+def bench_read(tables=50):
+	results = {}
+	with Sqlite_Connection(':memory:') as conn:
+		for i in range(tables):
+			conn.create_table(f'test_{i}', [('id', 'INTEGER'), ('age', 'INTEGER'), ('name', 'TEXT')])
+		results['read/all_tables'] = {'us_per_call':per_call(lambda: list(conn.all_tables()))}
+		results['read/db_fields'] = {'us_per_call':per_call(lambda: list(conn.db_fields('test_0')))}
+	return results
+
+
+def run(sizes=SIZES):
+	#create_table prints its sql, keep the report readable
+	stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+	try:
+		results = {**bench_build(), **bench_insert(sizes), **bench_read()}
+	finally:
+		sys.stdout.close()
+		sys.stdout = stdout
+	return {'python':platform.python_version(), 'sqlite':sqlite3.sqlite_version,
+			'results':results}
+
+
+def _score(result):
+	'''a number where higher is slower'''
+	if 'us_per_call' in result:
+		return result['us_per_call']
+	return 1 / result['rows_per_sec']
+
+
+def compare(current, baseline, threshold=0.1):
+	'''returns the names of the cases more than threshold slower than the baseline'''
+	regressions = []
+	for name, result in current['results'].items():
+		if name not in baseline['results']:
+			continue
+		change = _score(result) / _score(baseline['results'][name]) - 1
+		flag = 'REGRESSION' if change > threshold else ''
+		print(f'{name:<40}{change:+8.1%} {flag}')
+		if flag:
+			regressions.append(name)
+	return regressions
+
+
+def report(results):
+	for name, result in results['results'].items():
+		if 'us_per_call' in result:
+			print(f'{name:<40}{result["us_per_call"]:12.2f} us/call')
+		else:
+			print(f'{name:<40}{result["rows_per_sec"]:12,.0f} rows/s')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument('--sizes', default=','.join(map(str, SIZES)), help='comma separated insert sizes')
+	parser.add_argument('--output', help='write the results to this json file')
+	parser.add_argument('--baseline', help='json results to compare against')
+	parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown, 0.1 = 10%%')
+	args = parser.parse_args(argv)
+	results = run([int(size) for size in args.sizes.split(',')])
+	report(results)
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=2)
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		return 1 if compare(results, baseline, args.threshold) else 0
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,67 @@
+'''
+Cost of validating the rows passed to Sqlite_Connection.insert_into.
+
+before: the set comprehension + python loop used before the fast path
+after: Sqlite_Connection._valid_field_data
+insert_into: the whole insert_into of the valid rows, validated and with trusted=True
+			 which skips validation
+
+usage: python benchmarks/bench_validation.py [rows]
+defaults to 5,000,000 rows
+'''
+import os
+import sys
+import time
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+from sqlite_db.sqlite_script import Sqlite_Connection
+
+
+def valid_field_data_before(fields, data):
+	if (type(fields) != tuple) or (type(data) != tuple and type(data) != list):
+		raise TypeError('fields must be a tupel, while data can be a tuple or a list of tuples')
+	if {type(item) for item in data} != {tuple}:
+		raise TypeError('Data can be a tuple or a list of tuples')
+	error_msg = ''
+	for i, item in enumerate(data):
+		if len(fields) != len(data[i]):
+			error_msg += f'\nrow {i} has {len(fields)} feild(s) and {len(data[i])} inputs'
+	if error_msg != '':
+		raise ValueError(error_msg)
+	return fields, data
+
+
+def timed(f, *args, repeat=5):
+	'''best of repeat runs'''
+	times = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		try:
+			f(*args)
+		except (TypeError, ValueError):
+			pass
+		times.append(time.perf_counter() - start)
+	return min(times)
+
+
+def main(rows=5000000):
+	fields = ('id', 'age', 'name')
+	valid = [(i, i % 100, 'name') for i in range(rows)]
+	cases = (('valid', valid), ('invalid first row', [[0, 0, 'name']] + valid[1:]),
+			('invalid last row', valid[:-1] + [(1, 2)]))
+	results = {}
+	for name, data in cases:
+		before = timed(valid_field_data_before, fields, data)
+		after = timed(Sqlite_Connection._valid_field_data, fields, data)
+		results[name] = {'before':before, 'after':after}
+		print(f'{name:<18} before {before:7.3f} s   after {after:7.3f} s   {before / after:7.1f}x')
+	for trusted in (False, True):
+		with Sqlite_Connection(':memory:') as conn:
+			conn.cur.execute('CREATE TABLE test (id INTEGER, age INTEGER, name TEXT);')
+			seconds = timed(conn.insert_into, 'test', fields, valid, None, trusted, repeat=1)
+		results['insert_into trusted' if trusted else 'insert_into'] = {'seconds':seconds}
+		print(f'{"insert_into":<18} {"trusted" if trusted else "validated":<9} {seconds:7.3f} s')
+	return results
+
+if __name__ == '__main__':
+	main(*(int(arg) for arg in sys.argv[1:2]))
@@ -1,21 +1,307 @@
-'''connection parameters 
+'''connection parameters
 
 database: the name of the database that you want to connect.
 user: the username used to authenticate.
 password: password used to authenticate.
 host: database server address e.g., localhost or an IP address
 port: the port number that defaults to 5432 if it is not provided.
+
+Any parameter that isn't passed to Postgres_Connection is read from the
+DATABASE, USER, PASSWORD, HOST and PORT environment variables when the connection is made.
 '''
-# import psycopg2
+import os
+import sys
+import gzip
+import time
+#adds the top level directory to the path
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(path)
+from contextlib import contextmanager
+from functools import wraps
+from itertools import count, islice
+from templates import query_string as qs
+from templates import row_data
+try:
+	import psycopg2
+	from psycopg2.pool import ThreadedConnectionPool
+except ImportError:
+	psycopg2 = None
+
+#names the server side cursors opened by select
+_cursor_ids = count()
+
+def connection_pool(db=None, user=None, password=None, host=None, port=None, minconn=1, maxconn=5):
+	'''a psycopg2 ThreadedConnectionPool that can be shared by several Postgres_Connections'''
+	if psycopg2 is None:
+		raise ImportError('psycopg2 is required to connect to postgres: pip install psycopg2')
+	return ThreadedConnectionPool(minconn, maxconn,
+								dbname=db or os.environ.get('DATABASE'),
+								user=user or os.environ.get('USER'),
+								password=password or os.environ.get('PASSWORD'),
+								host=host or os.environ.get('HOST', 'localhost'),
+								port=port or os.environ.get('PORT', 5432))
 
 
-DATABASE = os.environ['DATABASE']
-USER = os.environ['USER']
-PASSWORD = os.environ['PASSWORD']
-HOST = os.environ['HOST']
-PORT = os.environ['PORT']
+class _Copy_Buffer:
+	'''
+	file like object that formats rows as csv for COPY FROM STDIN as they are read,
+	so the rows never have to be in memory at once.
+	strings are always quoted and None is left empty, which COPY reads as NULL
+	'''
+	def __init__(self, rows):
+		self.rows = iter(rows)
+		self.buffer = ''
+		self.count = 0
+
+	@staticmethod
+	def _value(value):
+		if value is None:
+			return ''
+		if isinstance(value, str):
+			return '"' + value.replace('"', '""') + '"'
+		if isinstance(value, (bytes, bytearray, memoryview)):
+			return '\\x' + bytes(value).hex()
+		return str(value)
+
+	def read(self, size=-1):
+		lines = [self.buffer]
+		length = len(self.buffer)
+		for row in self.rows:
+			line = ','.join([self._value(value) for value in row]) + '\n'
+			lines.append(line)
+			length += len(line)
+			self.count += 1
+			if 0 < size <= length:
+				break
+		data = ''.join(lines)
+		if size > 0:
+			data, self.buffer = data[:size], data[size:]
+		else:
+			self.buffer = ''
+		return data
 
 
 class Postgres_Connection:
-	def __init__(self, db, user, password, host, port):
-		self.conn = psycopg2.connect()
\ No newline at end of file
+	def __init__(self, db=None, user=None, password=None, host=None, port=None, pool=None, maxconn=5):
+		'''
+		db, user, password, host, port: see the module docstring
+		pool: a shared connection_pool(), when None the connection owns a pool of up to maxconn connections
+		'''
+		self._owns_pool = pool is None
+		self.pool = pool if pool is not None else connection_pool(db, user, password, host, port, maxconn=maxconn)
+		self.conn = self.pool.getconn()
+		self.cur = self.conn.cursor()
+
+	@property
+	def data_types(self):
+		return ('SMALLINT', 'INTEGER', 'BIGINT', 'SERIAL', 'BIGSERIAL', 'REAL', 'DOUBLE PRECISION', 'NUMERIC',
+				'BOOLEAN', 'TEXT', 'VARCHAR', 'CHAR', 'DATE', 'TIME', 'TIMESTAMP', 'TIMESTAMPTZ', 'BYTEA', 'JSON', 'JSONB')
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exec_type, exc_val, traceback):
+		self.conn.commit()
+		self.cur.close()
+		self.pool.putconn(self.conn)
+		if self._owns_pool:
+			self.pool.closeall()
+
+	def _yield_row(f):
+		'''Decorator to be used with functions that reuturn db table rows'''
+		@wraps(f)
+		def wrapper(*args, **kwars):
+			rows = f(*args, **kwars)
+			for row in rows:
+				yield row
+		return wrapper
+
+	@_yield_row
+	def all_tables(self):
+		self.cur.execute(qs.all_postgres_tables())
+		return self.cur
+
+	@_yield_row
+	def db_fields(self, table):
+		'''yields (column_name, data_type, is_nullable, column_default) for each field'''
+		self.cur.execute(qs.postgres_table_fields(), (table,))
+		return self.cur
+
+	def create_table(self, table_name='', fields=[], custom_sql=None):
+		'''
+		fields: a list of dicts like [{'field':'age', 'data_type':'INTEGER', 'extra':'NOT NULL'}, ...],
+				or a list of tuples like [('age', 'INTEGER', 'NOT NULL'), ('name', 'TEXT'), ...]
+		custom_query_str: define a custom SQL query string
+		'''
+		if custom_sql:
+			sql = custom_sql
+		else:
+			fields = self._check_fields(fields)
+			sql = qs.create_table(table_name, fields)
+		self.cur.execute(sql)
+		self.conn.commit()
+
+	def drop_table(self, table):
+		sql = qs.drop_table(table)
+		try:
+			self.cur.execute(sql)
+		#if the table doesnt exist the transaction is aborted and has to be rolled back
+		except psycopg2.errors.UndefinedTable:
+			self.conn.rollback()
+			print(f'{table} does not exist')
+
+	def _check_fields(self, fields):
+		if {type(item) for item in fields} == {tuple}:
+			fields = row_data.convert_tuple_to_dict(fields)
+		elif {type(item) for item in fields} != {dict}:
+			raise TypeError(("fields must be a list of dicts like [{'field':_, 'data_type':_, 'extra':_}, ...]"
+							" or a list of tuples like [('field', 'data_type', 'extra'), ...]"))
+		for item in fields:
+			for key in item.keys():
+				if key not in ['field', 'data_type', 'extra']:
+					raise ValueError(f'Unknown key: {key}. must be either field, data_type, or extra')
+			#VARCHAR(20), NUMERIC(10, 2), ...
+			if item['data_type'].split('(')[0].strip().upper() not in self.data_types:
+				raise ValueError(f'data_types must be one of {self.data_types}')
+		return fields
+
+	def insert_into(self, table, fields=(), data=(), data_dict=None, copy=False):
+		'''
+		table : the db table to insert into
+		fields: tuple defining all sql fields to insert into the table
+		data: single tuple, or list of tuples, where each index of the tuple coresponds to a field.
+		data_dict: a dict of field,value pairs: {field1: [value1, value2, ...], field2:[...],...}
+					If a value is provided, fields and data will be ignored
+		copy: load the rows with COPY FROM STDIN instead of executemany, much faster for bulk loads.
+				data can then be any iterable of tuples, it is streamed to the server
+		returns the number of rows inserted with copy, otherwise None
+		'''
+		if data_dict:
+			fields, data = row_data.dict_to_rows(data_dict)
+		elif copy and type(data) != tuple:
+			if type(fields) != tuple:
+				raise TypeError('fields must be a tupel, while data can be any iterable of tuples')
+		else:
+			fields, data = row_data.valid_field_data(fields, data)
+		if copy:
+			if type(data) == tuple:
+				data = [data]
+			return self._copy(table, fields, data)
+		sql = qs.insert_into(table, fields, place_holder='%s')
+		if type(data) == tuple:
+			self.cur.execute(sql, data)
+		else:
+			self.cur.executemany(sql, data)
+
+	def _copy(self, table, fields, rows):
+		buffer = _Copy_Buffer(rows)
+		self.cur.copy_expert(qs.copy_from(table, fields), buffer)
+		return buffer.count
+
+	@contextmanager
+	def _savepoint(self, name):
+		'''
+		like Sqlite_Connection._savepoint, only the block's own work is rolled back if it raises.
+		psycopg2 always has a transaction open, so it's commited with the rest of the transaction
+		'''
+		self.cur.execute(f'SAVEPOINT {name};')
+		try:
+			yield
+		except BaseException:
+			self.cur.execute(f'ROLLBACK TO SAVEPOINT {name};')
+			self.cur.execute(f'RELEASE SAVEPOINT {name};')
+			raise
+		self.cur.execute(f'RELEASE SAVEPOINT {name};')
+
+	def insert_stream(self, table, fields, rows, trusted=False):
+		'''
+		table : the db table to insert into
+		fields: tuple defining all sql fields to insert into the table
+		rows: any iterable or generator of tuples, validated as they are streamed to the server with COPY
+		trusted: skip validating the rows
+		if any row is invalid or the COPY fails every row of the stream is rolled back
+		returns the number of rows inserted
+		'''
+		if type(fields) != tuple:
+			raise TypeError('fields must be a tupel, while rows can be any iterable of tuples')
+		if not trusted:
+			rows = row_data.validate_rows(fields, rows)
+		with self._savepoint('insert_stream'):
+			return self._copy(table, fields, rows)
+
+	def update(self, table, fields, update_field, rows, batch_size=10000):
+		'''
+		table: the db table to update
+		fields: tuple of the fields to set
+		update_field: the key field that selects the row to update
+		rows: any iterable of tuples (value of each field..., key value)
+		batch_size: number of rows passed to each executemany call
+		All rows are updated in a single savepoint, rolled back if anything fails
+		returns the number of updated rows
+		'''
+		sql = qs.update_table(table, tuple(fields), update_field, place_holder='%s')
+		rows = iter(rows)
+		updated = 0
+		with self._savepoint('update_rows'):
+			while True:
+				chunk = list(islice(rows, batch_size))
+				if not chunk:
+					return updated
+				self.cur.executemany(sql, chunk)
+				updated += self.cur.rowcount
+
+	def delete(self, table, params=(), **query):
+		'''
+		table: the db table to delete from
+		params: values bound to the place holders of the search condition
+		query: any other keyword argument of query_string.delete_field 
+				ex) search_condition=('age',), operator=('<',)
+		returns the number of deleted rows
+		'''
+		query.setdefault('place_holder', '%s')
+		self.cur.execute(qs.delete_field(table, **query), params or None)
+		return self.cur.rowcount
+
+	def table_to_csv(self, table, csv_path, fields=('*',), params=(), header=True, compress=None, **query):
+		'''
+		writes the rows of a select to csv_path with COPY ... TO STDOUT, the server formats the csv
+		table, fields, params, query: like select
+		header: write the field names as the first row
+		compress: 'gzip' or None, defaults to 'gzip' when csv_path ends with .gz
+		returns a dict with the rows, bytes written, seconds, rows_per_sec and the written files
+		'''
+		if compress is None and csv_path.endswith('.gz'):
+			compress = 'gzip'
+		if compress not in (None, 'gzip'):
+			raise ValueError("compress must be 'gzip' or None")
+		query.setdefault('place_holder', '%s')
+		start = time.perf_counter()
+		#COPY can't bind parameters, mogrify quotes them into the sql
+		sql = self.cur.mogrify(qs.select(table, fields, **query), params or None).decode()
+		opener = gzip.open if compress else open
+		with opener(csv_path, 'wt', newline='') as f:
+			self.cur.copy_expert(qs.copy_to(sql, header), f)
+		rows = self.cur.rowcount
+		seconds = time.perf_counter() - start
+		return {'rows':rows, 'bytes':os.path.getsize(csv_path), 'seconds':seconds,
+				'rows_per_sec':rows / seconds if seconds else 0.0, 'files':[csv_path]}
+
+	def select(self, table=None, fields=('*',), params=(), custom_sql=None, batch_size=1000, **query):
+		'''
+		same arguments as Sqlite_Connection.select, rows are streamed from a server side (named)
+		cursor batch_size at a time, so large results are never held in memory
+		'''
+		query.setdefault('place_holder', '%s')
+		sql = custom_sql if custom_sql else qs.select(table, fields, **query)
+		cur = self.conn.cursor(name=f'select_{id(self)}_{next(_cursor_ids)}')
+		cur.itersize = batch_size
+		cur.execute(sql, params or None)
+		return self._fetch(cur)
+
+	@staticmethod
+	def _fetch(cur):
+		try:
+			yield from cur
+		finally:
+			cur.close()
+
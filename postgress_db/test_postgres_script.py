@@ -0,0 +1,100 @@
+'''
+These tests need a throwaway postgres database, ex)
+	docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=test postgres
+	POSTGRES_TEST_DATABASE=postgres USER=postgres PASSWORD=test HOST=localhost pytest postgress_db
+'''
+import os
+import sys
+#adds the top level directory to the path
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+import pytest
+from postgress_db import postgres_script
+from postgress_db.postgres_script import Postgres_Connection, _Copy_Buffer, connection_pool
+
+DATABASE = os.environ.get('POSTGRES_TEST_DATABASE')
+requires_postgres = pytest.mark.skipif(postgres_script.psycopg2 is None or DATABASE is None,
+										reason='needs psycopg2 and POSTGRES_TEST_DATABASE')
+
+
+class Test_Copy_Buffer:
+	def test_formatting(self):
+		buffer = _Copy_Buffer([(1, 'a "b"', None), (2.5, '', b'\x01')])
+		assert buffer.read() == '1,"a ""b""",\n2.5,"",\\x01\n'
+		assert buffer.count == 2
+
+	def test_sized_reads(self):
+		buffer = _Copy_Buffer((i, 'x') for i in range(100))
+		chunks = []
+		while True:
+			chunk = buffer.read(64)
+			if not chunk:
+				break
+			assert len(chunk) <= 64
+			chunks.append(chunk)
+		assert ''.join(chunks) == ''.join(f'{i},"x"\n' for i in range(100))
+
+
+@pytest.fixture(scope='module')
+def pool():
+	pool = connection_pool(db=DATABASE)
+	yield pool
+	pool.closeall()
+
+
+@pytest.fixture(scope='function')
+def pg_table(pool):
+	table = 'test_table'
+	conn = Postgres_Connection(pool=pool)
+	conn.create_table(table, [('id', 'INTEGER'), ('name', 'TEXT')])
+	yield conn, table
+	conn.drop_table(table)
+	conn.__exit__(None, None, None)
+
+
+@requires_postgres
+class Test_Postgres_Connection:
+	def test_tables_and_fields(self, pg_table):
+		conn, table = pg_table
+		assert table in [row[0] for row in conn.all_tables()]
+		assert ['id', 'name'] == [row[0] for row in conn.db_fields(table)]
+
+	def test_insert_and_select(self, pg_table):
+		conn, table = pg_table
+		conn.insert_into(table, ('id', 'name'), [(1, 'Tom'), (2, 'Bob')])
+		rows = conn.select(table, ('name',), (1,), search_condition=('id',), operator=('>',))
+		assert [('Bob',)] == list(rows)
+
+	def test_copy(self, pg_table):
+		conn, table = pg_table
+		count = conn.insert_into(table, ('id', 'name'), ((i, None if i % 2 else '') for i in range(1000)), copy=True)
+		assert count == 1000
+		conn.cur.execute(f'SELECT count(*), count(name) FROM {table}')
+		assert conn.cur.fetchone() == (1000, 500)
+
+	def test_insert_stream_rolls_back(self, pg_table):
+		conn, table = pg_table
+		assert 2 == conn.insert_stream(table, ('id', 'name'), iter([(1, 'Tom'), (2, 'Bob')]))
+		with pytest.raises(ValueError):
+			conn.insert_stream(table, ('id', 'name'), iter([(3, 'Jack'), (4,)]))
+		assert [(1,), (2,)] == list(conn.select(table, ('id',), order_by=('id',)))
+
+	def test_update_and_delete(self, pg_table):
+		conn, table = pg_table
+		conn.insert_into(table, ('id', 'name'), [(i, 'old') for i in range(10)])
+		assert 5 == conn.update(table, ('name',), 'id', (('new', i) for i in range(0, 10, 2)), batch_size=2)
+		assert 5 == conn.delete(table, ('new',), search_condition=('name',))
+		assert [('old',)] * 5 == list(conn.select(table, ('name',)))
+
+	def test_table_to_csv(self, pg_table, tmp_path):
+		conn, table = pg_table
+		conn.insert_into(table, ('id', 'name'), [(1, 'Tom'), (2, None)])
+		csv_path = str(tmp_path / 'export.csv')
+		stats = conn.table_to_csv(table, csv_path, ('id', 'name'), (1,), search_condition=('id',), operator=('>=',))
+		assert stats['rows'] == 2
+		with open(csv_path) as f:
+			assert f.read() == 'id,name\n1,Tom\n2,\n'
+
+
+if __name__ == '__main__':
+	pytest.main()
@@ -0,0 +1,192 @@
+'''
+asyncio interface for Sqlite_Connection.
+
+async with AsyncSqlite_Connection('test.db') as conn:
+	await conn.insert_into('test', ('id',), [(1,), (2,)])
+	await conn.commit()
+	async for row in conn.select('test'):
+		...
+
+Writes run one at a time on a dedicated writer thread that owns the writing connection.
+Reads run on a small pool of reader threads, each query holding its own reader connection
+while it is iterated, so a long insert never blocks the event loop or the readers.
+Readers only see commited data. Exiting the block commits and closes like Sqlite_Connection.__exit__
+
+A loop that stops reading early holds on to its reader until the rows are garbage collected,
+reading them in an async with block gives the reader back as soon as the block exits:
+	async with conn.select('test') as rows:
+		async for row in rows:
+			break
+'''
+import os
+import sys
+#adds the top level directory to the path
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(path)
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from sqlite_db.sqlite_script import Sqlite_Connection
+from templates import query_string as qs
+
+
+class _Rows:
+	'''the rows of a read, an async iterator and an async context manager that closes it'''
+	__slots__ = ('_rows',)
+
+	def __init__(self, rows):
+		self._rows = rows
+
+	def __aiter__(self):
+		return self
+
+	def __anext__(self):
+		return self._rows.__anext__()
+
+	async def aclose(self):
+		'''stops the read and gives its reader connection back'''
+		await self._rows.aclose()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exec_type, exc_val, traceback):
+		await self.aclose()
+
+
+class AsyncSqlite_Connection:
+	def __init__(self, db_path, readers=2, wal=True, batch_size=1000, **connect_kwargs):
+		'''
+		db_path: path to the sqlite database, an in memory database sends reads to the writer
+		readers: number of reader threads and connections
+		wal: put a database file in write ahead log mode so reads and writes don't block each other
+		batch_size: number of rows fetched per trip to a reader thread
+		connect_kwargs: passed to sqlite3.connect
+		'''
+		self.db_path = db_path
+		self.batch_size = batch_size
+		self.wal = wal
+		self.connect_kwargs = {**connect_kwargs, 'check_same_thread':False}
+		self.readers = 0 if db_path == ':memory:' else readers
+		self.conn = None
+		self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite-writer')
+		self._reader_pool = ThreadPoolExecutor(max_workers=max(self.readers, 1), 
+												thread_name_prefix='sqlite-reader')
+		self._reader_conns = []
+		# reader connections being opened, they count towards readers before they exist
+		self._opening = 0
+		self._idle_readers = None
+
+	async def _run(self, executor, f, *args, **kwargs):
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(executor, partial(f, *args, **kwargs))
+
+	def _connect(self):
+		conn = Sqlite_Connection(self.db_path, **self.connect_kwargs)
+		if self.wal and self.db_path != ':memory:':
+			conn.cur.execute('PRAGMA journal_mode=WAL;')
+		return conn
+
+	def _call_writer(self, method, *args, **kwargs):
+		if self.conn is None:
+			self.conn = self._connect()
+		return getattr(self.conn, method)(*args, **kwargs)
+
+	async def _write(self, method, *args, **kwargs):
+		return await self._run(self._writer, self._call_writer, method, *args, **kwargs)
+
+	def _read_on_writer(self, method, *args, **kwargs):
+		'''
+		a read on the writer connection (in memory databases), on its own cursor
+		so reads iterated at the same time don't share self.conn.cur
+		'''
+		if method == 'select':
+			return self._call_writer('select', *args, new_cursor=True, **kwargs)
+		if self.conn is None:
+			self.conn = self._connect()
+		sql = qs.all_sqlite_tables() if method == 'all_tables' else qs.table_fields(*args)
+		return self.conn.conn.cursor().execute(sql)
+
+	async def _checkout_reader(self):
+		if self._idle_readers is None:
+			self._idle_readers = asyncio.Queue()
+		if self._idle_readers.empty() and len(self._reader_conns) + self._opening < self.readers:
+			self._opening += 1
+			try:
+				conn = await self._run(self._reader_pool, self._connect)
+			finally:
+				self._opening -= 1
+			self._reader_conns.append(conn)
+			return conn
+		return await self._idle_readers.get()
+
+	async def _read(self, method, *args, **kwargs):
+		'''runs a Sqlite_Connection method that returns rows and yields them in batches'''
+		if not self.readers:
+			executor = self._writer
+			rows = await self._run(executor, self._read_on_writer, method, *args, **kwargs)
+			async for row in self._iterate(executor, rows):
+				yield row
+			return
+		conn = await self._checkout_reader()
+		try:
+			rows = await self._run(self._reader_pool, getattr(conn, method), *args, **kwargs)
+			async for row in self._iterate(self._reader_pool, rows):
+				yield row
+		finally:
+			#an abandoned read can be closed after close() dropped the queue
+			if self._idle_readers is not None:
+				self._idle_readers.put_nowait(conn)
+
+	async def _iterate(self, executor, rows):
+		while True:
+			batch = await self._run(executor, lambda: list(islice(rows, self.batch_size)))
+			if not batch:
+				break
+			for row in batch:
+				yield row
+
+	def all_tables(self):
+		return _Rows(self._read('all_tables'))
+
+	def db_fields(self, table):
+		return _Rows(self._read('db_fields', table))
+
+	def select(self, *args, **kwargs):
+		'''same arguments as Sqlite_Connection.select, see _Rows'''
+		return _Rows(self._read('select', *args, **kwargs))
+
+	async def create_table(self, *args, **kwargs):
+		return await self._write('create_table', *args, **kwargs)
+
+	async def drop_table(self, table):
+		return await self._write('drop_table', table)
+
+	async def insert_into(self, *args, **kwargs):
+		return await self._write('insert_into', *args, **kwargs)
+
+	async def insert_stream(self, *args, **kwargs):
+		return await self._write('insert_stream', *args, **kwargs)
+
+	async def commit(self):
+		if self.conn is not None:
+			await self._run(self._writer, self.conn.conn.commit)
+
+	async def close(self):
+		'''commits the writer and closes every connection, like Sqlite_Connection.__exit__'''
+		if self.conn is not None:
+			await self._run(self._writer, self.conn.__exit__, None, None, None)
+			self.conn = None
+		for conn in self._reader_conns:
+			await self._run(self._reader_pool, conn.conn.close)
+		self._reader_conns = []
+		self._idle_readers = None
+		self._writer.shutdown(wait=True)
+		self._reader_pool.shutdown(wait=True)
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exec_type, exc_val, traceback):
+		await self.close()
@@ -0,0 +1,96 @@
+'''
+Loads many independent tables in parallel, one process per sqlite database file.
+
+results = load_tables({
+	'data/sales.db/orders': (('id', 'total'), order_rows),
+	'data/sales.db/customers': {'id':[1, 2], 'name':['Tom', 'Bob']},
+	'data/logs.db/events': read_events,
+})
+
+A row source is either
+	(fields, rows): fields a tuple, rows any iterable of tuples
+	a data_dict: {field: [values], ...} like Sqlite_Connection.insert_into
+	a function that takes no arguments and returns one of the above. It runs inside the worker,
+	so large sources are generated there instead of being pickled (it has to be a module level function)
+
+Tables of the same database file are loaded one after the other by the same worker,
+since sqlite allows a single writer per file. A table that fails is rolled back and reported,
+the other tables keep loading.
+'''
+import os
+import sys
+#adds the top level directory to the path
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(path)
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from sqlite_db.sqlite_script import Sqlite_Connection
+
+
+def split_key(key):
+	'''('db_path', 'table') or 'db_path/table' ---> (db_path, table)'''
+	if isinstance(key, tuple):
+		return key
+	db_path, _, table = key.rpartition('/')
+	if not db_path:
+		raise ValueError(f'{key} must look like db_path/table')
+	return db_path, table
+
+
+def _load_table(conn, table, source, chunk_size, schema):
+	if callable(source):
+		source = source()
+	if schema:
+		conn.create_table(table, schema)
+	if isinstance(source, dict):
+		fields, rows = conn._dict_to_rows(source)
+		return conn.insert_stream(table, fields, rows, chunk_size=chunk_size, trusted=True)
+	fields, rows = source
+	return conn.insert_stream(table, tuple(fields), rows, chunk_size=chunk_size)
+
+
+def _load_db(db_path, tables, chunk_size):
+	'''worker: loads every (key, table, source, schema) of one database file'''
+	results = []
+	with Sqlite_Connection(db_path) as conn:
+		for key, table, source, schema in tables:
+			start = time.perf_counter()
+			try:
+				rows, error = _load_table(conn, table, source, chunk_size, schema), None
+			except Exception as err:
+				conn.conn.rollback()
+				rows, error = 0, f'{type(err).__name__}: {err}'
+			seconds = time.perf_counter() - start
+			results.append((key, {'rows':rows, 'seconds':seconds,
+								'rows_per_sec':rows / seconds if seconds else 0.0, 'error':error}))
+	return results
+
+
+def load_tables(jobs, processes=None, chunk_size=10000, schemas=None):
+	'''
+	jobs: a dict {'db_path/table': row_source, ...}, keys can also be (db_path, table) tuples
+	processes: size of the process pool, defaults to the number of cpus
+	chunk_size: number of rows per executemany call
+	schemas: an optional dict {key: fields} used to create missing tables first,
+			 fields as accepted by Sqlite_Connection.create_table
+	returns a dict {key: {'rows', 'seconds', 'rows_per_sec', 'error'}} where error is None
+	for the tables that loaded
+	'''
+	schemas = schemas or {}
+	by_db = OrderedDict()
+	for key, source in jobs.items():
+		db_path, table = split_key(key)
+		by_db.setdefault(db_path, []).append((key, table, source, schemas.get(key)))
+	results = {}
+	with ProcessPoolExecutor(max_workers=processes) as pool:
+		futures = {db_path:pool.submit(_load_db, db_path, tables, chunk_size) for db_path, tables in by_db.items()}
+		for db_path, future in futures.items():
+			try:
+				results.update(future.result())
+			#the worker itself failed, ex) a source that can't be pickled
+			except Exception as err:
+				for key, *_ in by_db[db_path]:
+					results[key] = {'rows':0, 'seconds':0.0, 'rows_per_sec':0.0,
+									'error':f'{type(err).__name__}: {err}'}
+	return results
@@ -0,0 +1,186 @@
+'''
+Row factories and a columnar reader for Sqlite_Connection results.
+
+	'tuple': plain tuples, sqlite3's default
+	'row': sqlite3.Row, access by index or column name, holds the tuple plus a reference to the cursor's columns
+	'slots': instances of a class generated once per column shape with one __slots__ attribute per column,
+			 access by index, column name or attribute ex) row.name, and a little smaller than a tuple
+
+conn = Sqlite_Connection('test.db', row_factory='slots')
+for row in conn.select('test', ('id', 'name')):
+	print(row.id, row['name'], row[0])
+
+collect_columns reads a whole result set into one array.array (or list) per column,
+8 bytes per number instead of a pointer plus a python int or float object.
+'''
+import keyword
+import sqlite3
+from array import array
+from collections import OrderedDict
+from operator import attrgetter
+
+ROW_FACTORIES = ('tuple', 'row', 'slots')
+
+
+class _Slots_Row:
+	'''base of the row_class classes, _fields and _values are set on each subclass'''
+	__slots__ = ()
+
+	def _tuple(self):
+		return self._values(self)
+
+	def __iter__(self):
+		return iter(self._values(self))
+
+	def __len__(self):
+		return len(self._fields)
+
+	def __getitem__(self, key):
+		if type(key) is str:
+			try:
+				return getattr(self, self._fields[self._columns.index(key)])
+			except ValueError:
+				raise KeyError(key)
+		return self._values(self)[key]
+
+	def __eq__(self, other):
+		if isinstance(other, (tuple, _Slots_Row)):
+			return self._values(self) == tuple(other)
+		return NotImplemented
+
+	__hash__ = None
+
+	def __repr__(self):
+		values = ', '.join(f'{field}={value!r}' for field, value in zip(self._fields, self._values(self)))
+		return f'Row({values})'
+
+	def keys(self):
+		'''the column names, like sqlite3.Row.keys'''
+		return list(self._columns)
+
+	def _asdict(self):
+		return OrderedDict(zip(self._columns, self._values(self)))
+
+
+# a slot with one of these names would hide the method of _Slots_Row
+_RESERVED = frozenset(dir(_Slots_Row))
+
+
+def _identifiers(columns):
+	'''
+	column names as attribute names, ones that can't be (count(*), class, duplicates, 
+	a method of the row like keys) become _<index>
+	'''
+	fields, seen = [], set()
+	for i, column in enumerate(columns):
+		if (not column.isidentifier() or keyword.iskeyword(column) or column.startswith('_') 
+				or column in _RESERVED or column in seen):
+			column = f'_{i}'
+		seen.add(column)
+		fields.append(column)
+	return tuple(fields)
+
+
+def row_class(columns):
+	'''
+	columns: the column names of a result set
+	returns a _Slots_Row subclass with one __slots__ attribute per column
+	'''
+	columns = tuple(columns)
+	fields = _identifiers(columns)
+	# a generated __init__ is as fast as a python constructor can be, like collections.namedtuple's __new__
+	body = ''.join(f'\n\tself.{field} = {field}' for field in fields) or '\n\tpass'
+	namespace = {}
+	exec(f'def __init__(self, {", ".join(fields)}):{body}', namespace)
+	getter = attrgetter(*fields) if fields else (lambda row: ())
+	values = getter if len(fields) != 1 else (lambda row: (getter(row),))
+	return type('Row', (_Slots_Row,), {'__slots__':fields, '__init__':namespace['__init__'],
+										'_fields':fields, '_columns':columns, '_values':staticmethod(values)})
+
+
+def slots_row_factory():
+	'''
+	returns a sqlite3 row_factory that builds a row_class instance for each row.
+	the class of each column shape is built once, and looked up once per query
+	'''
+	classes = {}
+	# (description, class) of the last query, cursor.description is the same object for every row
+	last = [(None, None)]
+	def factory(cursor, row):
+		description, cls = last[0]
+		if description is not cursor.description:
+			description = cursor.description
+			columns = tuple(column[0] for column in description)
+			cls = classes.get(columns)
+			if cls is None:
+				cls = classes[columns] = row_class(columns)
+			last[0] = (description, cls)
+		return cls(*row)
+	return factory
+
+
+def row_factory(name):
+	'''name: one of ROW_FACTORIES, returns the matching sqlite3 row_factory (None for plain tuples)'''
+	if name is None or name == 'tuple':
+		return None
+	if name == 'row':
+		return sqlite3.Row
+	if name == 'slots':
+		return slots_row_factory()
+	raise ValueError(f'row_factory must be one of {ROW_FACTORIES}')
+
+
+def _typecode(values):
+	'''q for a column of integers, d for floats (or floats and integers), None for anything else'''
+	kinds = set(map(type, values))
+	if kinds == {int}:
+		return 'q'
+	if float in kinds and kinds <= {int, float}:
+		return 'd'
+	return None
+
+
+def _extend(column, values, strict):
+	if type(column) is list:
+		column.extend(values)
+		return column
+	size = len(column)
+	try:
+		column.extend(values)
+	except (TypeError, OverflowError):
+		if strict:
+			raise
+		#ex) a NULL or a value too large for 8 bytes, keep the column as a list from now on
+		del column[size:]
+		column = column.tolist()
+		column.extend(values)
+	return column
+
+
+def collect_columns(cur, batch_size=1000, typecodes=None):
+	'''
+	reads every row of an executed cursor into one container per column.
+	typecodes: {column: array typecode} ex) {'age':'i'}, a value that doesn't fit raises TypeError or OverflowError.
+			   the other columns are guessed from their first batch: array('q') for integers,
+			   array('d') for floats and a list for anything else.
+			   a guessed array that later meets a value it can't store (NULL, text, ...) turns into a list
+	returns an OrderedDict {column: array.array or list}
+	'''
+	columns = [column[0] for column in cur.description]
+	typecodes = typecodes or {}
+	data = None
+	while True:
+		rows = cur.fetchmany(batch_size)
+		if not rows:
+			break
+		values = list(zip(*rows))
+		if data is None:
+			data = []
+			for column, column_values in zip(columns, values):
+				typecode = typecodes.get(column) or _typecode(column_values)
+				data.append(array(typecode) if typecode else [])
+		for i, column in enumerate(columns):
+			data[i] = _extend(data[i], values[i], column in typecodes)
+	if data is None:
+		data = [array(typecodes[column]) if column in typecodes else [] for column in columns]
+	return OrderedDict(zip(columns, data))
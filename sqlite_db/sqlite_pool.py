@@ -0,0 +1,194 @@
+'''
+A thread safe pool of Sqlite_Connection objects.
+
+with pool.checkout() as conn:
+	conn.insert_into('test', ('id',), [(1,), (2,)])
+	fields = list(conn.db_fields('test'))
+
+Each checkout hands the calling thread its own connection (nested checkouts in the same thread
+get the same one). The connection is commited when the block exits, or rolled back if it raised.
+Don't use the checked out connection as a context manager, Sqlite_Connection.__exit__ closes it.
+'''
+import os
+import sys
+#adds the top level directory to the path
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(path)
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from sqlite_db.sqlite_script import Sqlite_Connection
+
+
+class Sqlite_Pool:
+	def __init__(self, db_path, size=5, timeout=5.0, wal=True, health_check=True, **connect_kwargs):
+		'''
+		db_path: path to the sqlite database file, in memory databases can't be shared by a pool
+		size: maximum number of open connections
+		timeout: seconds to wait for a free connection before raising TimeoutError
+		wal: put the database in write ahead log mode so readers don't block the writer
+		health_check: run SELECT 1 on each checkout and replace connections that fail
+		connect_kwargs: passed to sqlite3.connect
+		'''
+		if db_path == ':memory:':
+			raise ValueError('an in memory database can not be shared by a pool')
+		if size < 1:
+			raise ValueError('size must be at least 1')
+		self.db_path = db_path
+		self.size = size
+		self.timeout = timeout
+		self.wal = wal
+		self.health_check = health_check
+		self.connect_kwargs = {**connect_kwargs, 'check_same_thread':False}
+		self._idle = queue.LifoQueue()
+		self._lock = threading.Lock()
+		self._local = threading.local()
+		self._open = 0
+		self._in_use = 0
+		self._closed = False
+		self._created = time.perf_counter()
+		self._checkouts = 0
+		self._timeouts = 0
+		self._replaced = 0
+		self._wait_total = 0.0
+		self._wait_max = 0.0
+		self._held_total = 0.0
+
+	def _connect(self):
+		conn = Sqlite_Connection(self.db_path, **self.connect_kwargs)
+		if self.wal:
+			conn.cur.execute('PRAGMA journal_mode=WAL;')
+		return conn
+
+	def _healthy(self, conn):
+		try:
+			conn.cur.execute('SELECT 1;').fetchone()
+			return True
+		except sqlite3.Error:
+			return False
+
+	def _acquire(self):
+		start = time.perf_counter()
+		conn = None
+		while conn is None:
+			try:
+				conn = self._idle.get_nowait()
+			except queue.Empty:
+				with self._lock:
+					can_open = self._open < self.size
+					if can_open:
+						self._open += 1
+				if can_open:
+					try:
+						conn = self._connect()
+					except BaseException:
+						with self._lock:
+							self._open -= 1
+						raise
+					break
+				remaining = self.timeout - (time.perf_counter() - start)
+				try:
+					conn = self._idle.get(timeout=max(remaining, 0))
+				except queue.Empty:
+					with self._lock:
+						self._timeouts += 1
+					raise TimeoutError(f'no connection was returned to the pool within {self.timeout} seconds')
+			if self.health_check and not self._healthy(conn):
+				self._discard(conn)
+				with self._lock:
+					self._replaced += 1
+				conn = None
+		waited = time.perf_counter() - start
+		with self._lock:
+			self._in_use += 1
+			self._checkouts += 1
+			self._wait_total += waited
+			self._wait_max = max(self._wait_max, waited)
+		return conn
+
+	def _release(self, conn, held):
+		with self._lock:
+			self._in_use -= 1
+			self._held_total += held
+			closed = self._closed
+		if closed:
+			self._discard(conn)
+		else:
+			self._idle.put(conn)
+
+	def _discard(self, conn):
+		try:
+			conn.conn.close()
+		except sqlite3.Error:
+			pass
+		with self._lock:
+			self._open -= 1
+
+	@contextmanager
+	def checkout(self):
+		'''yields a Sqlite_Connection owned by the calling thread until the block exits'''
+		if self._closed:
+			raise ValueError('the pool is closed')
+		conn = getattr(self._local, 'conn', None)
+		if conn is not None:
+			#nested checkout in the same thread
+			self._local.depth += 1
+			try:
+				yield conn
+			finally:
+				self._local.depth -= 1
+			return
+		conn = self._acquire()
+		self._local.conn, self._local.depth = conn, 0
+		start = time.perf_counter()
+		try:
+			yield conn
+		except BaseException:
+			conn.conn.rollback()
+			raise
+		else:
+			conn.conn.commit()
+		finally:
+			self._local.conn = None
+			self._release(conn, time.perf_counter() - start)
+
+	def metrics(self):
+		'''
+		returns a dict with:
+			open, in_use, idle: current connection counts
+			checkouts, timeouts, replaced: totals since the pool was created 
+			wait_total, wait_max, wait_avg: seconds spent waiting for a connection
+			utilization: share of the pool's capacity (size x lifetime) connections were checked out
+		'''
+		with self._lock:
+			elapsed = time.perf_counter() - self._created
+			return {
+				'size':self.size,
+				'open':self._open,
+				'in_use':self._in_use,
+				'idle':self._open - self._in_use,
+				'checkouts':self._checkouts,
+				'timeouts':self._timeouts,
+				'replaced':self._replaced,
+				'wait_total':self._wait_total,
+				'wait_max':self._wait_max,
+				'wait_avg':self._wait_total / self._checkouts if self._checkouts else 0.0,
+				'utilization':self._held_total / (elapsed * self.size) if elapsed else 0.0,
+			}
+
+	def close(self):
+		'''closes the idle connections, checked out ones are closed when they are returned'''
+		self._closed = True
+		while True:
+			try:
+				self._discard(self._idle.get_nowait())
+			except queue.Empty:
+				break
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exec_type, exc_val, traceback):
+		self.close()
@@ -10,14 +10,137 @@ import sys
 #adds the top level directory to the path
 path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(path)
+import re
+import csv
+import gzip
+import time
+import logging
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import OrderedDict, namedtuple
 from functools import wraps
+from itertools import islice, chain
 from templates import query_string as qs
+from templates import instrumentation
+from templates import row_data
+from sqlite_db import rows as row_factories
+
+# only numbers that are written the way sqlite gives them back, so a type is never inferred for
+# values that would be changed by it ex) zip codes and padded ids like '02134' or '007', '+5'
+# REAL also needs digits on both sides of the point, so '.5', '1e5' or 'e5' stay TEXT
+_INTEGER = re.compile(r'0|-?[1-9]\d*')
+_REAL = re.compile(r'-?(0|[1-9]\d*)\.\d+')
+
+# pragmas used by bulk_load_pragmas, cache_size is negative so it's in KiB (here ~200MB)
+BULK_LOAD_PRAGMAS = {'synchronous':'OFF', 'journal_mode':'MEMORY', 'cache_size':-200000}
+
+
+# tables with at least this many rows are flagged by Sqlite_Connection.advise when they are scanned
+ADVISE_MIN_ROWS = 10000
+
+# one step of EXPLAIN QUERY PLAN, parent is the id of the step it is nested in (0 for the top level)
+Plan_Step = namedtuple('Plan_Step', 'id parent detail')
+
+advisor_log = logging.getLogger('sql_query_templates.advisor')
+# indexes deferred_indexes couldn't rebuild after the block raised
+index_log = logging.getLogger('sql_query_templates.indexes')
+
+# authorizer action codes of statements that change the schema
+_DDL_ACTIONS = frozenset(getattr(sqlite3, name) for name in dir(sqlite3) 
+						if name.startswith(('SQLITE_CREATE_', 'SQLITE_DROP_')) or name == 'SQLITE_ALTER_TABLE')
+# the end of the CREATE TABLE sql of a table that has no rowid
+_WITHOUT_ROWID = re.compile(r'\)\s*WITHOUT\s+ROWID\s*;?\s*$', re.IGNORECASE)
+# SCAN t, SCAN TABLE t (sqlite < 3.36) optionally followed by AS alias / USING INDEX ...
+_SCAN = re.compile(r'SCAN (?:TABLE )?(\w+)')
+
+
+def _is_integer(value):
+	#larger integers would be stored as REAL and lose digits
+	return _INTEGER.fullmatch(value) is not None and -2**63 <= int(value) < 2**63
+
+def _is_real(value):
+	if _INTEGER.fullmatch(value):
+		return _is_integer(value)
+	return _REAL.fullmatch(value) is not None
+
+
+@contextmanager
+def _no_context():
+	yield
+
 
 class Sqlite_Connection:
-	def __init__(self, db_path):
-		self.conn = sqlite3.connect(db_path)
+	def __init__(self, db_path, cached_statements=256, schema_cache=True, row_factory='tuple', **connect_kwargs):
+		'''
+		cached_statements: size of sqlite3's prepared statement cache, 
+							and of the registry of sql strings built by this connection
+		schema_cache: keep the results of all_tables and db_fields until the schema changes,
+					  see _schema_rows. it installs a sqlite3 authorizer, replacing it with 
+					  conn.set_authorizer turns off the checks of this connection's own DDL
+		row_factory: the type of the rows returned by every query, 'tuple', 'row' (sqlite3.Row) 
+					 or 'slots' (a __slots__ class per column shape), see sqlite_db/rows.py
+		connect_kwargs: passed to sqlite3.connect ex) timeout=10, check_same_thread=False
+		'''
+		self.db_path = db_path
+		self.conn = sqlite3.connect(db_path, cached_statements=cached_statements, **connect_kwargs)
+		self.conn.row_factory = row_factories.row_factory(row_factory)
+		self.row_factory = row_factory
 		self.cur = self.conn.cursor()
+		self.cached_statements = cached_statements
+		# (operation, table, fields, ...) ---> sql string, see _statement
+		self._statements = OrderedDict()
+		self._statement_hits = 0
+		self._statement_misses = 0
+		self.schema_cache = schema_cache
+		# 'tables' or ('fields', table) ---> rows, valid for _schema_version
+		self._schema = {}
+		self._schema_version = None
+		if schema_cache:
+			self.conn.set_authorizer(self._authorize)
+
+	def _statement(self, key, build, *args, **kwargs):
+		'''
+		returns the sql string registered for key, or registers build(*args, **kwargs).
+		handing sqlite3 the very same string lets it reuse the prepared statement from its cache
+		'''
+		sql = self._statements.get(key)
+		if sql is None:
+			self._statement_misses += 1
+			sql = self._statements[key] = build(*args, **kwargs)
+			if len(self._statements) > self.cached_statements:
+				self._statements.popitem(last=False)
+		else:
+			self._statement_hits += 1
+			self._statements.move_to_end(key)
+		return sql
+
+	def _run(self, operation, table, build, params=(), many=False, cur=None):
+		'''
+		executes the sql returned by build() on cur (default self.cur) and returns the cursor.
+		when an instrumentation collector is enabled the render and execute times are reported
+		'''
+		cur = cur or self.cur
+		execute = cur.executemany if many else cur.execute
+		if not instrumentation.collector.enabled:
+			return execute(build(), params)
+		start = time.perf_counter()
+		sql = build()
+		rendered = time.perf_counter()
+		execute(sql, params)
+		done = time.perf_counter()
+		batch_size = (len(params) if hasattr(params, '__len__') else None) if many else 1
+		instrumentation.emit(operation, table, rendered - start, done - rendered, cur.rowcount, batch_size)
+		return cur
+
+	def statement_info(self):
+		'''
+		returns a dict with the registered statements and how many sql builds were avoided by 
+		the registry (hits) or needed (misses). these count lookups in the registry, not sqlite3's 
+		own statement cache, which prepares each distinct string at most once while it holds it
+		'''
+		return {'hits':self._statement_hits, 'misses':self._statement_misses, 
+				'statements':len(self._statements), 'cached_statements':self.cached_statements}
 
 	@property
 	def data_types(self):
@@ -42,12 +165,52 @@ class Sqlite_Connection:
 	@_yield_row
 	def all_tables(self):
 		sql = qs.all_sqlite_tables()
-		return self.cur.execute(sql)
+		return self._schema_rows('tables', sql)
 
 	@_yield_row
 	def db_fields(self, table):
-		sql = qs.table_fields(table=table)
-		return self.cur.execute(sql)
+		sql = self._statement(('table_fields', table), qs.table_fields, table=table)
+		return self._schema_rows(('fields', table), sql)
+
+	def _schema_rows(self, key, sql):
+		'''
+		runs a schema query, or returns its cached rows when schema_cache is on.
+		a hit costs no query at all. any CREATE, DROP or ALTER prepared on this connection (temp schema
+		included) drops the cache, see _authorize, and every miss compares PRAGMA schema_version, 
+		which sqlite increments on each change to the main schema from any connection.
+		so only DDL from another connection can leave hits stale, until the next miss or clear_schema_cache
+		'''
+		if not self.schema_cache:
+			return self.cur.execute(sql)
+		rows = self._schema.get(key)
+		if rows is not None:
+			return rows
+		version = self.conn.execute('PRAGMA schema_version;').fetchone()[0]
+		if version != self._schema_version:
+			self._schema = {}
+			self._schema_version = version
+		rows = self._schema[key] = self.cur.execute(sql).fetchall()
+		return rows
+
+	def _authorize(self, action, *args):
+		'''
+		sqlite3 authorizer, sqlite calls it for every action of a statement while preparing it,
+		which happens once per statement string while it stays in sqlite3's statement cache
+		'''
+		if action in _DDL_ACTIONS:
+			self.clear_schema_cache()
+		return sqlite3.SQLITE_OK
+
+	def clear_schema_cache(self):
+		self._schema = {}
+		self._schema_version = None
+
+	def set_row_factory(self, row_factory):
+		'''row_factory: one of sqlite_db.rows.ROW_FACTORIES, used by every cursor from now on'''
+		self.conn.row_factory = self.cur.row_factory = row_factories.row_factory(row_factory)
+		self.row_factory = row_factory
+		#cached schema rows were built by the old factory
+		self.clear_schema_cache()
 
 	def create_table(self, table_name='', fields=[], custom_sql=None):
 		'''
@@ -56,13 +219,16 @@ class Sqlite_Connection:
 		custom_query_str: define a custom SQL query string
 		'''
 		if custom_sql:
-			sql = custom_sql
+			build = lambda: custom_sql
 		else:
 			fields = self._check_fields(fields)
-			sql = qs.create_table(table_name, fields)
-			print(sql)
-		self.cur.execute(sql)
+			def build():
+				sql = qs.create_table(table_name, fields)
+				print(sql)
+				return sql
+		self._run('create_table', table_name, build)
 		self.conn.commit()
+		self.clear_schema_cache()
 
 	def drop_table(self, table):
 		sql = qs.drop_table(table)
@@ -71,13 +237,148 @@ class Sqlite_Connection:
 		#if the table doesnt exist an operational error will occer
 		except sqlite3.OperationalError:
 			print(f'{table} does not exist')		
+		self.clear_schema_cache()
+
+	def create_index(self, table, fields, name=None, unique=False):
+		'''
+		fields: the indexed fields, each one can be followed by ASC or DESC ex) ('age', 'name DESC')
+		name: defaults to query_string.index_name(table, fields)
+		returns the index name
+		'''
+		name = name or qs.index_name(table, fields)
+		self._run('create_index', table, lambda: qs.create_index(table, fields, name, unique))
+		self.conn.commit()
+		self.clear_schema_cache()
+		return name
+
+	def drop_index(self, name):
+		self.cur.execute(qs.drop_index(name))
+		self.conn.commit()
+		self.clear_schema_cache()
+
+	def indexes(self, table):
+		'''returns (name, sql) of every index created on table with CREATE INDEX'''
+		#indexes sqlite adds for UNIQUE and PRIMARY KEY constraints have no sql and can't be dropped
+		return self.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+								"AND tbl_name = ? AND sql IS NOT NULL;", (table,)).fetchall()
+
+	@contextmanager
+	def deferred_indexes(self, table):
+		'''
+		drops the indexes of table and rebuilds them on exit.
+		filling a table and then indexing it once is faster than updating every index for each row
+		with conn.deferred_indexes('test'):
+			conn.insert_stream('test', fields, rows)
+		UNIQUE indexes stay in place so the block can't load rows that break them.
+		the block is commited when it exits, or its uncommited work rolled back if it raised.
+		each index is rebuilt on its own, if any can't be a sqlite3.DatabaseError names them.
+		when the block raised, its error is the one raised and the failed rebuilds are logged to index_log
+		yields the (name, sql) of the dropped indexes
+		'''
+		unique = {row[1] for row in self.conn.execute(f'PRAGMA index_list({table});') if row[2]}
+		indexes = [(name, sql) for name, sql in self.indexes(table) if name not in unique]
+		for name, _ in indexes:
+			self.cur.execute(qs.drop_index(name))
+		self.conn.commit()
+		try:
+			yield indexes
+		except BaseException:
+			self.conn.rollback()
+			try:
+				self._rebuild_indexes(indexes)
+			except sqlite3.DatabaseError as err:
+				index_log.error('%s, after deferred_indexes(%r) raised', err, table)
+			raise
+		self.conn.commit()
+		self._rebuild_indexes(indexes)
+
+	@contextmanager
+	def _savepoint(self, name):
+		'''
+		runs the block inside SAVEPOINT name. on success it is released, which commits it when no
+		transaction was open before, or leaves it part of the caller's transaction. on error only the
+		block's own work is rolled back, whatever the caller had pending stays as it was
+		'''
+		self.cur.execute(f'SAVEPOINT {name};')
+		try:
+			yield
+		except BaseException:
+			self.cur.execute(f'ROLLBACK TO {name};')
+			self.cur.execute(f'RELEASE {name};')
+			raise
+		self.cur.execute(f'RELEASE {name};')
+
+	def _rebuild_indexes(self, indexes):
+		failed = []
+		for name, sql in indexes:
+			try:
+				self.cur.execute(sql)
+				self.conn.commit()
+			except sqlite3.DatabaseError as err:
+				self.conn.rollback()
+				failed.append(f'{name} ({err})')
+		self.clear_schema_cache()
+		if failed:
+			raise sqlite3.DatabaseError(f'indexes not restored: {", ".join(failed)}')
+
+	def explain(self, sql, params=()):
+		'''
+		sql: a query string, params: values for its place holders
+		returns the steps of its EXPLAIN QUERY PLAN as Plan_Step(id, parent, detail)
+		ex) Plan_Step(2, 0, 'SEARCH test USING INDEX test_age_idx (age>?)')
+		'''
+		return [Plan_Step(*row[:2], row[-1]) for row in self.conn.execute(qs.explain(sql), params)]
+
+	def advise(self, sql, params=(), min_rows=ADVISE_MIN_ROWS):
+		'''
+		flags every full table scan in the plan of sql on a table with at least min_rows rows,
+		each one is logged as a warning to the sql_query_templates.advisor logger.
+		newer sqlite versions name aliased tables by their alias (SCAN a), those scans are skipped
+		returns a list of dicts {'table', 'rows', 'detail'}
+		'''
+		flagged = []
+		for step in self.explain(sql, params):
+			scan = _SCAN.match(step.detail)
+			if not scan:
+				continue
+			rows = self._row_estimate(scan.group(1))
+			if rows is not None and rows >= min_rows:
+				flagged.append({'table':scan.group(1), 'rows':rows, 'detail':step.detail})
+				advisor_log.warning('%s reads about %s rows, consider an index for: %s', 
+									step.detail, rows, sql)
+		return flagged
+
+	def _row_estimate(self, table):
+		'''
+		number of rows of table, read from sqlite_stat1 when ANALYZE has been run, otherwise 
+		estimated from its rowids so it doesn't have to be counted (WITHOUT ROWID tables are counted).
+		None for names that aren't tables ex) a view or a subquery
+		'''
+		sql = self._table_sql(table)
+		if sql is None:
+			return None
+		if self._table_sql('sqlite_stat1') is not None:
+			#the first number of each stat is the row count of the table
+			stat = self.conn.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1;', (table,)).fetchone()
+			if stat is not None:
+				return int(stat[0].split()[0])
+		if _WITHOUT_ROWID.search(sql):
+			return self.conn.execute(qs.select(table, ('count(*)',))).fetchone()[0]
+		low, high = self.conn.execute(qs.select(table, ('min(rowid)', 'max(rowid)'))).fetchone()
+		return 0 if low is None else high - low + 1
+
+	def _table_sql(self, table):
+		'''the CREATE TABLE sql of table, None when there is no such table (views included)'''
+		row = self.conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?;", (table,)).fetchone()
+		return None if row is None else row[0]
 
 	def _check_fields(self, fields):
+		types = set(map(type, fields))
 		#if its a list of tuples
-		if {type(item) for item in fields} == {tuple}:
+		if types == {tuple}:
 			return self._convert_tuple_to_dict(fields)
 		#if its a list of dicts
-		elif{type(item) for item in fields} == {dict}:
+		elif types == {dict}:
 			return self._validate_dict_keys(fields)
 		else:
 			raise TypeError(("fields must be a list of dicts like [{'field':_, 'data_type':_, 'extra':_}, ...]"
@@ -92,24 +393,14 @@ class Sqlite_Connection:
 				raise ValueError(f'data_types must be one of {self.data_types}')
 		return fields
 
-	@staticmethod
-	def _convert_tuple_to_dict(fields):
-		'''fields: a list of tuples, where the first index of each tuple is a table field
-					the second index is the data type, and the 
-					(optional) third index includes any other info like 'NOT NULL or PRIMARY KEY'
-					ex) [('age', 'INTEGER', 'NOT NULL'), ('name', 'TEXT'), ...]
-		'''
-		new_list = []
-		for item in fields:
-			if len(item) == 2:
-				new_list.append({'field':item[0], 'data_type':item[1]})
-			elif len(item) == 3:
-				new_list.append({'field':item[0], 'data_type':item[1], 'extra':item[2]})
-			else:
-				raise ValueError('Ensure that each tuple containse 2-3 elements (field, data_type, extra)')
-		return new_list
+	# shared with Postgres_Connection, see templates/row_data.py
+	_convert_tuple_to_dict = staticmethod(row_data.convert_tuple_to_dict)
+	_valid_field_data = staticmethod(row_data.valid_field_data)
+	_dict_to_rows = staticmethod(row_data.dict_to_rows)
+	_validate_rows = staticmethod(row_data.validate_rows)
 
-	def insert_into(self, table, fields=(), data=(), data_dict=None):
+	def insert_into(self, table, fields=(), data=(), data_dict=None, trusted=False, multi_row=False,
+					on_conflict=None, update_fields=None, resolve=None):
 		'''
 		table : the db table to insert into
 		fields: tuple defining all sql fields to insert into the table
@@ -118,40 +409,75 @@ class Sqlite_Connection:
 		data_dict:	An Alternate way to supply data to the function. 
 				   	If a value is provided, fields and data will be ignored 
 					a dict of field,value pairs: {field1: [value1, value2, value3, ...], field2:[...],...}
-					where each field should be a list of values (even if there is just one value)
+					where each field should be a list of values (even if there is just one value).
+					values can also be array.array or numpy arrays, the columns are zipped into rows
+					lazily and never copied into a list of tuples
+		trusted: skip validating fields and data, for producers that are known to send well formed rows
+		multi_row: pack the rows into INSERT ... VALUES (...), (...), ... statements that stay 
+					under sqlite's variable limit, fewer statement steps make narrow tables load faster
+		on_conflict, update_fields: upsert rows that break the on_conflict UNIQUE/PRIMARY KEY fields,
+					updating update_fields or, when there are none, skipping the row.
+					re-delivered rows are then written in the same executemany pass as new ones
+		resolve: INSERT OR <resolve> ex) 'IGNORE', 'REPLACE', see query_string.insert_into
 		'''
+		conflict = self._conflict_options(on_conflict, update_fields, resolve)
 		if data_dict:
-			fields, data = self._dict_to_tuple_list(data_dict)
-		else:
+			fields, data = self._dict_to_rows(data_dict)
+		elif not trusted:
 			fields, data = self._valid_field_data(fields, data)
-		sql = qs.insert_into(table, fields, place_holder='?')
+		#part of the statement key, trusted fields may still be a list
+		fields = tuple(fields)
+		if multi_row and type(data) != tuple:
+			return self._insert_multi_row(table, fields, data, conflict)
+		build = lambda: self._statement(('insert_into', table, fields, *conflict.values()), qs.insert_into, 
+										table, fields, place_holder='?', **conflict)
 		# determin weather to execute one or many depending on the type
-		if type(data) == tuple:
-			self.cur.execute(sql, data)
-		else:
-			self.cur.executemany(sql, data)
+		self._run('insert_into', table, build, data, many=type(data) != tuple)
 
 	@staticmethod
-	def _valid_field_data(fields, data):
+	def _conflict_options(on_conflict, update_fields, resolve):
+		'''the upsert keyword arguments of query_string.insert_into, as hashable values'''
+		return {'on_conflict':None if on_conflict is None else tuple(on_conflict), 
+				'update_fields':tuple(update_fields) if update_fields else None, 'resolve':resolve}
+
+	def _max_variables(self):
+		# Connection.getlimit was added in python 3.11
+		if hasattr(self.conn, 'getlimit'):
+			return self.conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+		return qs.SQLITE_MAX_VARIABLES
+
+	def _insert_multi_row(self, table, fields, rows, conflict):
 		'''
-		cheks that fields and data are the appropriate type before using them
-		this does not check that types match up with the db schema
+		executemany over statements holding rows_per_insert rows each, 
+		the rows left over at the end are inserted with one smaller statement.
+		every row must have one value per field, even trusted ones, otherwise flattening the rows
+		would shift values into the neighbouring rows
 		'''
-		if (type(fields) != tuple) or (type(data) != tuple and type(data) != list):
-			raise TypeError('fields must be a tupel, while data can be a tuple or a list of tuples')
-		if type(data) == tuple:
-			if len(fields) != len(data):
-				raise ValueError('Each field must correspond with a single data point')	
-		else:
-			if {type(item) for item in data} != {tuple}:
-				raise TypeError('Data can be a tuple or a list of tuples')
-			error_msg = ''
-			for i, item in enumerate(data):
-				if len(fields) != len(data[i]):
-					error_msg += f'\nrow {i} has {len(fields)} feild(s) and {len(data[i])} inputs'
-			if error_msg != '':
-				raise ValueError(error_msg)
-		return fields, data
+		width = len(fields)
+		per_statement = qs.rows_per_insert(width, self._max_variables())
+		rows = iter(rows)
+		remainder = []
+		#rows packed into full statements so far, to number the rows in errors
+		packed = [0]
+		def flatten(chunk, start):
+			if set(map(len, chunk)) != {width}:
+				i = next(i for i, row in enumerate(chunk) if len(row) != width)
+				raise ValueError(f'row {start + i} has {width} feild(s) and {len(chunk[i])} inputs')
+			return tuple(chain.from_iterable(chunk))
+		def full_statements():
+			while True:
+				chunk = list(islice(rows, per_statement))
+				if len(chunk) < per_statement:
+					remainder.extend(chunk)
+					return
+				yield flatten(chunk, packed[0])
+				packed[0] += per_statement
+		def build(count):
+			return self._statement(('insert_into', table, fields, count, *conflict.values()), qs.insert_into, 
+									table, fields, place_holder='?', rows=count, **conflict)
+		self._run('insert_into', table, lambda: build(per_statement), full_statements(), many=True)
+		if remainder:
+			self._run('insert_into', table, lambda: build(len(remainder)), flatten(remainder, packed[0]))
 
 	@staticmethod
 	def _dict_to_tuple_list(data: dict):
@@ -159,35 +485,440 @@ class Sqlite_Connection:
 		data: a dict of field, value pairs: {field1: [value1, value2, value3, ...], field2:...}
 				where each field should be a list of values (even if there is only just one)
 		'''
-		fields = tuple(data.keys())
-		#check that all the fields are the same length:
-		for i, field in  enumerate(fields):
-			if i == 0:
-				lenght = len(data[field])
-			if lenght != len(data[field]):
-				raise ValueError('Ensure that each field has a list of data of the same lenght')
-		all_data = []
-		for row in range(len(data[fields[0]])):
-			row_data = []
-			for field in fields:
-				row_data.append(data[field][row])
-			all_data.append(tuple(row_data))
-		return fields, all_data
+		fields, rows = Sqlite_Connection._dict_to_rows(data)
+		return fields, list(rows)
 
+	def insert_stream(self, table, fields, rows, chunk_size=10000, trusted=False, 
+						on_conflict=None, update_fields=None, resolve=None):
+		'''
+		table : the db table to insert into
+		fields: tuple defining all sql fields to insert into the table
+		rows: any iterable or generator of tuples, where each index of the tuple coresponds to a field.
+				rows are validated as they are consumed, so they never have to be in memory at once
+		chunk_size: number of rows passed to each executemany call
+		trusted: skip validating the rows
+		on_conflict, update_fields, resolve: upsert options, like insert_into
+		All chunks are written in a single savepoint that is released once the rows are exhausted,
+		if any row is invalid or a chunk fails every row of the stream is rolled back.
+		released on its own it is commited, inside an open transaction it is left for the caller to commit
+		returns the number of rows inserted
+		'''
+		if type(fields) != tuple:
+			raise TypeError('fields must be a tupel, while rows can be any iterable of tuples')
+		if chunk_size < 1:
+			raise ValueError('chunk_size must be at least 1')
+		conflict = self._conflict_options(on_conflict, update_fields, resolve)
+		build = lambda: self._statement(('insert_into', table, fields, *conflict.values()), qs.insert_into, 
+										table, fields, place_holder='?', **conflict)
+		if not trusted:
+			rows = self._validate_rows(fields, rows)
+		rows = iter(rows)
+		count = 0
+		with self._savepoint('insert_stream'):
+			while True:
+				chunk = list(islice(rows, chunk_size))
+				if not chunk:
+					break
+				self._run('insert_stream', table, build, chunk, many=True)
+				count += len(chunk)
+		return count
+
+	def update(self, table, fields, update_field, rows, batch_size=10000, temp_table_threshold=100000):
+		'''
+		table: the db table to update
+		fields: tuple of the fields to set
+		update_field: the key field that selects the row to update
+		rows: any iterable of tuples (value of each field..., key value), like the place holders of 
+				query_string.update_table
+		batch_size: number of rows passed to each executemany call
+		temp_table_threshold: up to this many rows are updated one statement per row with executemany,
+				larger sets are staged in a temp table and applied with a single set based UPDATE, 
+				see query_string.update_from. when a key is repeated any one of its rows may be applied
+		All rows are updated in a single savepoint, rolled back if anything fails. like insert_stream 
+		it is commited on its own, or left for the caller to commit inside an open transaction
+		returns the number of updated rows
+		'''
+		fields = tuple(fields)
+		rows = iter(rows)
+		head = list(islice(rows, temp_table_threshold + 1))
+		with self._savepoint('update_rows'):
+			if len(head) <= temp_table_threshold:
+				return self._update_rows(table, fields, update_field, head, batch_size)
+			return self._update_from_temp(table, fields, update_field, chain(head, rows), batch_size)
+
+	def _update_rows(self, table, fields, update_field, rows, batch_size):
+		build = lambda: self._statement(('update_table', table, fields, update_field), 
+										qs.update_table, table, fields, update_field)
+		count = 0
+		for start in range(0, len(rows), batch_size):
+			count += self._run('update', table, build, rows[start:start + batch_size], many=True).rowcount
+		return count
+
+	def _update_from_temp(self, table, fields, update_field, rows, batch_size):
+		source = f'temp._update_{table}'
+		#no data type, so the staged values keep their own type. no key index either, 
+		#sqlite joins on the index of table.update_field or builds an automatic one
+		columns = [{'field':field, 'data_type':''} for field in fields + (update_field,)]
+		self.cur.execute(qs.create_table(source, columns))
+		try:
+			insert = lambda: self._statement(('insert_into', source, fields + (update_field,)), 
+											qs.insert_into, source, fields + (update_field,))
+			while True:
+				chunk = list(islice(rows, batch_size))
+				if not chunk:
+					break
+				self._run('update', table, insert, chunk, many=True)
+			#UPDATE ... FROM was added in sqlite 3.33.0
+			join = sqlite3.sqlite_version_info >= (3, 33, 0)
+			build = lambda: qs.update_from(table, fields, update_field, source, join=join)
+			return self._run('update', table, build).rowcount
+		finally:
+			self.cur.execute(qs.drop_table(source, if_exists=True))
+
+
+	def select(self, table=None, fields=('*',), params=(), custom_sql=None, 
+				batch_size=1000, new_cursor=False, **query):
+		'''
+		table, fields: passed to query_string.select
+		params: values bound to the place holders of the query
+		custom_sql: define a custom SQL query string, table, fields and query are then ignored
+		batch_size: number of rows pulled from sqlite with each fetchmany call
+		new_cursor: run the query on a dedicated cursor so iterating over several selects 
+					at once doesn't clobber self.cur
+		query: any other keyword argument of query_string.select 
+				ex) search_condition=('age',), operator=('>',), order_by=('age',), limit={'limit':5}
+		returns a generator over the rows, they are never all loaded into memory
+		'''
+		build = lambda: custom_sql if custom_sql else qs.select(table, fields, **query)
+		cur = self.conn.cursor() if new_cursor else self.cur
+		#the query runs now, so errors are raised here rather than on the first row
+		self._run('select', table, build, params, cur=cur)
+		return self._fetch_batches(cur, batch_size, close=new_cursor)
+
+	def select_columns(self, table=None, fields=('*',), params=(), custom_sql=None, 
+						batch_size=1000, typecodes=None, **query):
+		'''
+		like select, but the whole result is collected into one container per column,
+		array.array for numeric columns and lists for the others
+		typecodes: {field: array typecode} for columns that shouldn't be guessed, see sqlite_db.rows.collect_columns
+		returns an OrderedDict {field: array.array or list}, ready for insert_into(data_dict=...)
+		'''
+		build = lambda: custom_sql if custom_sql else qs.select(table, fields, **query)
+		cur = self.conn.cursor()
+		#plain tuples, whatever the connection's row factory is
+		cur.row_factory = None
+		try:
+			self._run('select_columns', table, build, params, cur=cur)
+			return row_factories.collect_columns(cur, batch_size, typecodes)
+		finally:
+			cur.close()
 
-	def select(self, custom_sql=None):
+	def paginate(self, table, key_fields, page_size=1000, fields=('*',), order=None, params=(), **query):
+		'''
+		walks a whole table one page at a time with keyset (seek) pagination, 
+		each page seeks past the key of the previous page instead of scanning and discarding 
+		OFFSET rows, so every page costs the same however deep it is.
+		table, fields, params, query: like select
+		key_fields: fields that uniquely identify and order a row ex) ('id',) or ('created', 'id')
+					they have to be part of the selected fields
+		order: 'ASC' or 'DESC' for each key field, all of them the same
+		yields lists of at most page_size rows
 		'''
-		would be nice to pass a list of tuples condition :
-				--->['age > 25',...], [('age', '>', '25')], ['age', '25']
+		key_fields = tuple(key_fields)
+		limit = {'limit':page_size}
+		cur = self.conn.cursor()
+		try:
+			self._run('paginate', table, lambda: qs.select(table, fields, order_by=key_fields, order=order, 
+															limit=limit, **query), params, cur=cur)
+			positions = self._key_positions(cur, key_fields)
+			while True:
+				rows = cur.fetchall()
+				if rows:
+					yield rows
+				if len(rows) < page_size:
+					break
+				last = tuple(rows[-1][i] for i in positions)
+				self._run('paginate', table, lambda: qs.select(table, fields, order_by=key_fields, order=order,
+																limit=limit, seek=True, **query), 
+							tuple(params) + last, cur=cur)
+		finally:
+			cur.close()
+
+	@staticmethod
+	def _key_positions(cur, key_fields):
+		columns = [column[0] for column in cur.description]
+		try:
+			return [columns.index(field) for field in key_fields]
+		except ValueError:
+			raise ValueError(f'the key fields {key_fields} must be selected, the query returns {columns}')
 
+	@staticmethod
+	def _fetch_batches(cur, batch_size, close=False):
+		try:
+			while True:
+				rows = cur.fetchmany(batch_size)
+				if not rows:
+					break
+				yield from rows
+		finally:
+			if close:
+				cur.close()
+
+	def delete(self, table, params=(), chunk_size=None, **query):
+		'''
+		table: the db table to delete from
+		params: values bound to the place holders of the search condition
+		chunk_size: when set the table is walked in rowid ranges that hold chunk_size rows,
+					each range is deleted in its own savepoint, commited straight away 
+					so other connections can write in between (inside an open transaction 
+					they are left for the caller to commit). the ranges are found by seeking 
+					along the rowid index, so gaps between rowids cost nothing (not for WITHOUT ROWID tables)
+		query: any other keyword argument of query_string.delete_field 
+				ex) search_condition=('age',), operator=('<',)
+		returns the number of deleted rows
+		'''
+		if not chunk_size:
+			return self._run('delete', table, lambda: qs.delete_field(table, **query), params).rowcount
+		low, high = self.conn.execute(qs.select(table, ('min(rowid)', 'max(rowid)'))).fetchone()
+		if low is None:
+			return 0
+		build = lambda: qs.delete_field(table, between='rowid', **query)
+		count = 0
+		start = low
+		while start is not None and start <= high:
+			end = self._rowid_at(table, start, chunk_size - 1)
+			if end is None or end > high:
+				end = high
+			count += self._delete_chunk(table, build, tuple(params) + (start, end))
+			if end == high:
+				#end + 1 would overflow sqlite's integers when high is 2**63 - 1
+				return count
+			start = self._rowid_at(table, end + 1)
+		return count
+
+	def _rowid_at(self, table, start, offset=0):
+		'''the rowid offset rows after the first rowid >= start, None when there is none'''
+		sql = qs.select(table, ('rowid',), ('rowid',), operator=('>=',), order_by=('rowid',), 
+						limit={'limit':1, 'offset':offset})
+		row = self.conn.execute(sql, (start,)).fetchone()
+		return None if row is None else row[0]
+
+	def delete_keys(self, table, field, keys, chunk_size=500):
+		'''
+		deletes the rows whose field is one of keys with DELETE ... WHERE field IN (?, ...)
+		keys: any iterable of key values, it is consumed chunk_size keys at a time
+		chunk_size: keys per statement, each statement is commited in its own short transaction
+					(a savepoint left for the caller to commit inside an open transaction).
+					capped by sqlite's variable limit
+		returns the number of deleted rows
+		'''
+		chunk_size = max(1, min(chunk_size, self._max_variables()))
+		keys = iter(keys)
+		count = 0
+		while True:
+			chunk = tuple(islice(keys, chunk_size))
+			if not chunk:
+				return count
+			build = lambda: self._statement(('delete_in', table, field, len(chunk)), 
+											qs.delete_in, table, field, len(chunk))
+			count += self._delete_chunk(table, build, chunk)
+
+	def _delete_chunk(self, table, build, params):
+		with self._savepoint('delete_chunk'):
+			return self._run('delete', table, build, params).rowcount
+
+	def table_to_csv(self, table, csv_path, fields=('*',), batch_size=10000, header=True,
+						compress=None, shards=1):
+		'''
+		table: the db table to export
+		csv_path: file to write to
+		fields: the table fields to export
+		batch_size: number of rows fetched and written at a time
+		header: write the field names as the first row
+		compress: 'gzip' or None, defaults to 'gzip' when csv_path ends with .gz
+		shards: when > 1 the table is split into that many rowid ranges holding about the same number
+				of rows, each one is read by its own connection on a separate thread and written to 
+				csv_path with a _<shard> suffix ex) export.csv ---> export_0.csv, export_1.csv, ...
+				the other connections only see commited rows, so a sharded export can't be started 
+				inside an open transaction. views and WITHOUT ROWID tables can't be sharded
+		returns a dict with the rows, bytes written, seconds, rows_per_sec and the written files
 		'''
-		pass
+		if compress is None and csv_path.endswith('.gz'):
+			compress = 'gzip'
+		if compress not in (None, 'gzip'):
+			raise ValueError("compress must be 'gzip' or None")
+		start = time.perf_counter()
+		if shards > 1:
+			if self.db_path == ':memory:':
+				raise ValueError('an in memory database can not be exported in shards')
+			if self.conn.in_transaction:
+				raise ValueError('a sharded export can not see uncommited rows, commit or roll back first')
+			if not self._has_rowid(table):
+				raise ValueError(f'{table} has no rowid to split into shards, it is a view or a WITHOUT ROWID table')
+			sql = qs.select(table, fields, ('rowid', 'rowid'), operator=('>=', '<='))
+			jobs = []
+			for i, (low, high) in enumerate(self._rowid_ranges(table, shards)):
+				jobs.append((self._shard_path(csv_path, i), sql, (low, high)))
+			with ThreadPoolExecutor(max_workers=len(jobs) or 1) as pool:
+				counts = list(pool.map(lambda job: self._export_shard(*job, batch_size, header, compress), jobs))
+			files = [job[0] for job in jobs]
+		else:
+			cur = self.conn.cursor()
+			try:
+				cur.execute(qs.select(table, fields))
+				counts = [self._write_csv(cur, csv_path, batch_size, header, compress)]
+			finally:
+				cur.close()
+			files = [csv_path]
+		seconds = time.perf_counter() - start
+		rows = sum(counts)
+		return {'rows':rows, 'bytes':sum(os.path.getsize(f) for f in files), 'seconds':seconds,
+				'rows_per_sec':rows / seconds if seconds else 0.0, 'files':files}
+
+	def _has_rowid(self, table):
+		sql = self._table_sql(table)
+		return sql is not None and not _WITHOUT_ROWID.search(sql)
+
+	def _rowid_ranges(self, table, shards):
+		'''
+		splits the rowids of table into at most shards inclusive (low, high) ranges of about
+		the same number of rows, the bounds are found by seeking along the rowid index like delete
+		'''
+		rows, high = self.conn.execute(qs.select(table, ('count(*)', 'max(rowid)'))).fetchone()
+		if not rows:
+			return []
+		step = -(-rows // shards)
+		ranges = []
+		start = self._rowid_at(table, -2**63)
+		while True:
+			end = self._rowid_at(table, start, step - 1)
+			if end is None or end >= high:
+				ranges.append((start, high))
+				return ranges
+			ranges.append((start, end))
+			start = self._rowid_at(table, end + 1)
 
-	def table_to_csv(self, row, csv_path):
-		pass
+	@staticmethod
+	def _shard_path(csv_path, shard):
+		gz = '.gz' if csv_path.endswith('.gz') else ''
+		root, ext = os.path.splitext(csv_path[:len(csv_path) - len(gz)])
+		return f'{root}_{shard}{ext}{gz}'
+
+	def _export_shard(self, csv_path, sql, params, batch_size, header, compress):
+		conn = sqlite3.connect(self.db_path)
+		try:
+			return self._write_csv(conn.execute(sql, params), csv_path, batch_size, header, compress)
+		finally:
+			conn.close()
 
-	def csv_to_table(self, ):
-		pass
+	@staticmethod
+	def _write_csv(cur, csv_path, batch_size, header, compress):
+		'''writes the rows of an executed cursor to csv_path, returns the number of rows'''
+		if compress == 'gzip':
+			f = gzip.open(csv_path, 'wt', newline='')
+		else:
+			f = open(csv_path, 'w', newline='', buffering=1 << 20)
+		count = 0
+		with f:
+			writer = csv.writer(f)
+			if header:
+				writer.writerow([column[0] for column in cur.description])
+			while True:
+				rows = cur.fetchmany(batch_size)
+				if not rows:
+					break
+				writer.writerows(rows)
+				count += len(rows)
+		return count
+
+	def csv_to_table(self, csv_path, table, fields=None, header=True, types=None, sample_size=1000,
+						chunk_size=10000, bulk_pragmas=False, **csv_kwargs):
+		'''
+		csv_path: the csv file to import, files ending with .gz are read with gzip
+		table: table to create (if it doesn't exist) and insert into
+		fields: names of the table fields, defaults to the csv header
+		header: whether the first row of the file is a header
+		types: a dict {field: data_type} that overrides the inferred data types
+		sample_size: number of rows used to infer the data type of each field
+		chunk_size: number of rows inserted and commited per transaction 
+					(per savepoint, left for the caller to commit, inside an open transaction)
+		bulk_pragmas: switch to BULK_LOAD_PRAGMAS for the import and restore the old values afterwards
+		csv_kwargs: passed to csv.reader ex) delimiter='|'
+		empty values are inserted as NULL
+		returns the number of rows inserted
+		'''
+		opener = gzip.open if csv_path.endswith('.gz') else open
+		with opener(csv_path, 'rt', newline='') as f:
+			reader = csv.reader(f, **csv_kwargs)
+			first = next(reader, None) if header else None
+			sample = list(islice(reader, sample_size))
+			if fields is None:
+				if first is None:
+					raise ValueError('fields must be given when the csv file has no header')
+				fields = first
+			fields = tuple(fields)
+			data_types = self._infer_types(fields, sample)
+			data_types.update(types or {})
+			self.create_table(table, [(field, data_types[field]) for field in fields])
+			rows = ([value or None for value in row] for row in chain(sample, reader))
+			with self.bulk_load_pragmas() if bulk_pragmas else _no_context():
+				return self._insert_chunks(table, fields, rows, chunk_size)
+
+	def _insert_chunks(self, table, fields, rows, chunk_size):
+		'''executemany in chunks of chunk_size rows, each chunk is its own savepoint'''
+		build = lambda: self._statement(('insert_into', table, fields), qs.insert_into, table, fields, place_holder='?')
+		count = 0
+		while True:
+			chunk = list(islice(rows, chunk_size))
+			if not chunk:
+				return count
+			with self._savepoint('insert_chunk'):
+				self._run('csv_to_table', table, build, chunk, many=True)
+			count += len(chunk)
+
+	def _infer_types(self, fields, sample):
+		'''
+		picks the narrowest of INTEGER, REAL or TEXT that fits every non empty value of a field.
+		a field that is always empty is NULL (no type affinity)
+		'''
+		data_types = {}
+		for i, field in enumerate(fields):
+			values = [row[i] for row in sample if len(row) > i and row[i] != '']
+			if not values:
+				data_types[field] = 'NULL'
+			elif all(map(_is_integer, values)):
+				data_types[field] = 'INTEGER'
+			elif all(map(_is_real, values)):
+				data_types[field] = 'REAL'
+			else:
+				data_types[field] = 'TEXT'
+		return data_types
+
+	@contextmanager
+	def bulk_load_pragmas(self, **pragmas):
+		'''
+		temporarily switches the connection to BULK_LOAD_PRAGMAS (updated with pragmas)
+		the previous values are restored on exit.
+		synchronous=OFF trades durability for speed: a crash during the load can corrupt the db
+		journal_mode can't be changed inside a transaction, so commit or roll back before entering.
+		the block is commited when it exits, or its uncommited work rolled back if it raised
+		'''
+		if self.conn.in_transaction:
+			raise ValueError('bulk_load_pragmas can not be used inside an open transaction, commit or roll back first')
+		pragmas = {**BULK_LOAD_PRAGMAS, **pragmas}
+		previous = {name:self.cur.execute(f'PRAGMA {name};').fetchone()[0] for name in pragmas}
+		for name, value in pragmas.items():
+			self.cur.execute(f'PRAGMA {name} = {value};')
+		try:
+			yield self
+		except BaseException:
+			self.conn.rollback()
+			raise
+		else:
+			self.conn.commit()
+		finally:
+			for name, value in previous.items():
+				self.cur.execute(f'PRAGMA {name} = {value};')
 
 
 
@@ -0,0 +1,94 @@
+import os
+import sys
+#adds the top level directory to the path
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+import asyncio
+import pytest
+from sqlite_db.async_sqlite import AsyncSqlite_Connection
+
+
+async def collect(rows):
+	return [row async for row in rows]
+
+
+class Test_Async_Connection:
+	def test_write_then_read(self, tmp_path):
+		async def main():
+			async with AsyncSqlite_Connection(str(tmp_path / 'async.db'), batch_size=2) as conn:
+				await conn.create_table('test', [('id', 'INTEGER'), ('name', 'TEXT')])
+				await conn.insert_into('test', ('id', 'name'), [(1, 'Tom'), (2, 'Bob'), (3, 'Jack')])
+				await conn.commit()
+				tables = await collect(conn.all_tables())
+				fields = await collect(conn.db_fields('test'))
+				rows = await collect(conn.select('test', order_by=('id',), order=('DESC',)))
+			return tables, fields, rows
+		tables, fields, rows = asyncio.run(main())
+		assert [('test',)] == tables
+		assert ['id', 'name'] == [field[1] for field in fields]
+		assert [(3, 'Jack'), (2, 'Bob'), (1, 'Tom')] == rows
+
+	def test_commit_on_exit(self, tmp_path):
+		db_path = str(tmp_path / 'async.db')
+		async def write():
+			async with AsyncSqlite_Connection(db_path) as conn:
+				await conn.create_table('test', [('id', 'INTEGER')])
+				await conn.insert_stream('test', ('id',), ((i,) for i in range(100)))
+				await conn.insert_into('test', ('id',), (100,))
+		async def read():
+			async with AsyncSqlite_Connection(db_path) as conn:
+				return await collect(conn.select('test', ('count(*)',)))
+		asyncio.run(write())
+		assert [(101,)] == asyncio.run(read())
+
+	def test_concurrent_reads(self, tmp_path):
+		async def main():
+			async with AsyncSqlite_Connection(str(tmp_path / 'async.db'), readers=2, batch_size=10) as conn:
+				await conn.create_table('test', [('id', 'INTEGER')])
+				await conn.insert_into('test', ('id',), [(i,) for i in range(100)])
+				await conn.commit()
+				results = await asyncio.gather(*(collect(conn.select('test')) for _ in range(6)))
+				assert len(conn._reader_conns) <= 2
+			return results
+		for rows in asyncio.run(main()):
+			assert [(i,) for i in range(100)] == rows
+
+	def test_memory_db(self):
+		async def main():
+			async with AsyncSqlite_Connection(':memory:') as conn:
+				await conn.create_table('test', [('id', 'INTEGER')])
+				await conn.insert_into('test', ('id',), (1,))
+				return await collect(conn.select('test'))
+		assert [(1,)] == asyncio.run(main())
+
+	def test_memory_db_concurrent_reads(self):
+		async def main():
+			async with AsyncSqlite_Connection(':memory:', batch_size=1) as conn:
+				for table in ('a', 'b'):
+					await conn.create_table(table, [('id', 'INTEGER')])
+				await conn.insert_into('a', ('id',), [(1,), (2,)])
+				await conn.insert_into('b', ('id',), [(3,), (4,)])
+				return await asyncio.gather(collect(conn.select('a')), collect(conn.select('b')),
+											collect(conn.db_fields('a')))
+		a, b, fields = asyncio.run(main())
+		assert ([(1,), (2,)], [(3,), (4,)]) == (a, b)
+		assert ['id'] == [field[1] for field in fields]
+
+
+	def test_early_exit_returns_reader(self, tmp_path):
+		async def main():
+			async with AsyncSqlite_Connection(str(tmp_path / 'async.db'), readers=1, batch_size=2) as conn:
+				await conn.create_table('test', [('id', 'INTEGER')])
+				await conn.insert_into('test', ('id',), [(i,) for i in range(10)])
+				await conn.commit()
+				async with conn.select('test') as rows:
+					async for row in rows:
+						break
+				assert conn._idle_readers.qsize() == 1
+				#with the only reader given back the next read doesn't wait for it
+				return await asyncio.wait_for(collect(conn.select('test', ('count(*)',))), timeout=5)
+		assert [(10,)] == asyncio.run(main())
+
+
+if __name__ == '__main__':
+	pytest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+#adds the top level directory to the path
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+import pytest
+from sqlite_db.sqlite_script import Sqlite_Connection
+from sqlite_db.parallel_loader import load_tables, split_key
+
+
+def event_rows():
+	return ('id', 'name'), ((i, f'event_{i}') for i in range(1000))
+
+
+def test_split_key():
+	assert split_key('data/sales.db/orders') == ('data/sales.db', 'orders')
+	assert split_key(('sales.db', 'orders')) == ('sales.db', 'orders')
+	with pytest.raises(ValueError):
+		split_key('orders')
+
+
+def test_load_tables(tmp_path):
+	sales = str(tmp_path / 'sales.db')
+	logs = str(tmp_path / 'logs.db')
+	schema = [('id', 'INTEGER'), ('name', 'TEXT')]
+	jobs = {
+		f'{sales}/orders':(('id', 'name'), [(1, 'a'), (2, 'b')]),
+		f'{sales}/customers':{'id':[1, 2, 3], 'name':['Tom', 'Bob', 'Jack']},
+		f'{sales}/broken':(('id', 'name'), [(1, 'a'), (2,)]),
+		f'{logs}/events':event_rows,
+	}
+	results = load_tables(jobs, processes=2, chunk_size=100, schemas={key:schema for key in jobs})
+	assert {key:result['rows'] for key, result in results.items()} == {
+		f'{sales}/orders':2, f'{sales}/customers':3, f'{sales}/broken':0, f'{logs}/events':1000}
+	assert results[f'{sales}/broken']['error'] == 'ValueError: row 1 has 2 feild(s) and 1 inputs'
+	assert results[f'{logs}/events']['error'] is None
+	with Sqlite_Connection(sales) as conn:
+		assert [(3,)] == list(conn.select('customers', ('count(*)',)))
+		assert [] == list(conn.select('broken'))
+
+
+def test_worker_failure(tmp_path):
+	db = str(tmp_path / 'test.db')
+	other = str(tmp_path / 'other.db')
+	#lambdas can't be pickled, so the whole database fails. the error is recorded, not raised,
+	#and its type and wording depend on the python version
+	results = load_tables({f'{db}/a':lambda: (('id',), [(1,)]), f'{other}/b':(('id',), [(1,)])}, processes=1,
+							schemas={f'{other}/b':[('id', 'INTEGER')]})
+	assert results[f'{db}/a']['rows'] == 0
+	assert results[f'{db}/a']['error']
+	assert (results[f'{other}/b']['rows'], results[f'{other}/b']['error']) == (1, None)
+
+
+if __name__ == '__main__':
+	pytest.main()
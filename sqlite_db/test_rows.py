@@ -0,0 +1,94 @@
+import os
+import sys
+#adds the top level directory to the path
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+import sqlite3
+import pytest
+from array import array
+from sqlite_db.rows import row_class, row_factory, slots_row_factory, collect_columns
+
+
+@pytest.fixture(scope='function')
+def conn():
+	conn = sqlite3.connect(':memory:')
+	conn.execute('CREATE TABLE test (id INTEGER, score REAL, name TEXT)')
+	conn.executemany('INSERT INTO test VALUES (?, ?, ?)', [(i, i / 2, f'name_{i}') for i in range(2500)])
+	yield conn
+	conn.close()
+
+
+class Test_Row_Class:
+	def test_access(self):
+		Row = row_class(('id', 'name'))
+		row = Row(1, 'Tom')
+		assert (row.id, row.name) == (1, 'Tom')
+		assert (row[0], row[-1], row[:1], row['name']) == (1, 'Tom', (1,), 'Tom')
+		assert (1, 'Tom') == tuple(row) == row
+		assert len(row) == 2 and row.keys() == ['id', 'name']
+		assert repr(row) == "Row(id=1, name='Tom')"
+		with pytest.raises(KeyError):
+			row['age']
+
+	def test_no_dict(self):
+		row = row_class(('id',))(1)
+		assert tuple(row) == (1,)
+		with pytest.raises(AttributeError):
+			row.age = 1
+
+	def test_unusable_names(self):
+		row = row_class(('count(*)', 'class', 'id', 'id'))(1, 2, 3, 4)
+		assert row._fields == ('_0', '_1', 'id', '_3')
+		assert (row['count(*)'], row['class'], row.id, row._3) == (1, 2, 3, 4)
+
+	def test_method_names(self):
+		row = row_class(('keys', 'id'))(1, 2)
+		assert row._fields == ('_0', 'id')
+		assert row.keys() == ['keys', 'id']
+		assert (row['keys'], row._0) == (1, 1)
+
+
+class Test_Row_Factory:
+	def test_slots(self, conn):
+		conn.row_factory = slots_row_factory()
+		first = conn.execute('SELECT id, name FROM test ORDER BY id LIMIT 2').fetchall()
+		second = conn.execute('SELECT name, id FROM test ORDER BY id LIMIT 1').fetchone()
+		again = conn.execute('SELECT id, name FROM test ORDER BY id LIMIT 1').fetchone()
+		assert [(0, 'name_0'), (1, 'name_1')] == first
+		assert (second.name, second.id) == ('name_0', 0)
+		assert type(again) is type(first[0]) is not type(second)
+
+	def test_names(self):
+		assert row_factory('tuple') is None
+		assert row_factory('row') is sqlite3.Row
+		with pytest.raises(ValueError):
+			row_factory('dict')
+
+
+class Test_Collect_Columns:
+	def test_guessed(self, conn):
+		columns = collect_columns(conn.execute('SELECT * FROM test'), batch_size=1000)
+		assert list(columns) == ['id', 'score', 'name']
+		assert columns['id'] == array('q', range(2500))
+		assert columns['score'] == array('d', (i / 2 for i in range(2500)))
+		assert columns['name'] == [f'name_{i}' for i in range(2500)]
+
+	def test_falls_back_to_list(self, conn):
+		conn.execute('INSERT INTO test VALUES (NULL, 1, NULL)')
+		columns = collect_columns(conn.execute('SELECT id FROM test'), batch_size=1000)
+		assert columns['id'] == list(range(2500)) + [None]
+
+	def test_typecodes(self, conn):
+		columns = collect_columns(conn.execute('SELECT id FROM test'), typecodes={'id':'i'})
+		assert columns['id'].typecode == 'i'
+		conn.execute('INSERT INTO test VALUES (2.5, 1, NULL)')
+		with pytest.raises(TypeError):
+			collect_columns(conn.execute('SELECT id FROM test'), typecodes={'id':'i'})
+
+	def test_empty(self, conn):
+		columns = collect_columns(conn.execute('SELECT id, name FROM test WHERE id < 0'), typecodes={'id':'i'})
+		assert columns == {'id':array('i'), 'name':[]}
+
+
+if __name__ == '__main__':
+	pytest.main()
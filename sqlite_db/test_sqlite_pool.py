@@ -0,0 +1,95 @@
+import os
+import sys
+#adds the top level directory to the path
+PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PATH)
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from sqlite_db.sqlite_pool import Sqlite_Pool
+
+
+@pytest.fixture(scope='function')
+def pool(tmp_path):
+	pool = Sqlite_Pool(str(tmp_path / 'pool.db'), size=3, timeout=0.2)
+	with pool.checkout() as conn:
+		conn.create_table('test', [('id', 'INTEGER'), ('thread', 'TEXT')])
+	yield pool
+	pool.close()
+
+
+class Test_Pool:
+	def test_wal_mode(self, pool):
+		with pool.checkout() as conn:
+			assert conn.cur.execute('PRAGMA journal_mode;').fetchone()[0] == 'wal'
+
+	def test_existing_methods(self, pool):
+		with pool.checkout() as conn:
+			conn.insert_into('test', ('id', 'thread'), [(1, 'a'), (2, 'b')])
+		with pool.checkout() as conn:
+			assert ['test'] == [table[0] for table in conn.all_tables()]
+			assert ['id', 'thread'] == [field[1] for field in conn.db_fields('test')]
+			assert [(1, 'a'), (2, 'b')] == list(conn.select('test'))
+
+	def test_rollback_on_error(self, pool):
+		with pytest.raises(RuntimeError):
+			with pool.checkout() as conn:
+				conn.insert_into('test', ('id', 'thread'), (1, 'a'))
+				raise RuntimeError
+		with pool.checkout() as conn:
+			assert [] == list(conn.select('test'))
+
+	def test_threads(self, pool):
+		def work(i):
+			with pool.checkout() as conn:
+				conn.insert_into('test', ('id', 'thread'), (i, threading.current_thread().name))
+		with ThreadPoolExecutor(max_workers=8) as executor:
+			list(executor.map(work, range(50)))
+		with pool.checkout() as conn:
+			assert list(range(50)) == sorted(row[0] for row in conn.select('test', ('id',)))
+		metrics = pool.metrics()
+		assert metrics['open'] <= 3
+		assert metrics['checkouts'] == 52
+		assert metrics['in_use'] == 0
+
+	def test_nested_checkout_reuses_connection(self, pool):
+		with pool.checkout() as outer:
+			with pool.checkout() as inner:
+				assert inner is outer
+		assert pool.metrics()['checkouts'] == 2
+
+	def test_timeout(self, pool):
+		held = threading.Event()
+		release = threading.Event()
+		def hold():
+			with pool.checkout():
+				held.set()
+				release.wait()
+		threads = [threading.Thread(target=hold) for _ in range(3)]
+		for thread in threads:
+			thread.start()
+			held.wait()
+			held.clear()
+		with pytest.raises(TimeoutError):
+			with pool.checkout():
+				pass
+		release.set()
+		for thread in threads:
+			thread.join()
+		assert pool.metrics()['timeouts'] == 1
+
+	def test_unhealthy_connection_is_replaced(self, pool):
+		with pool.checkout() as conn:
+			pass
+		conn.conn.close()
+		with pool.checkout() as new_conn:
+			assert new_conn is not conn
+		assert pool.metrics()['replaced'] == 1
+
+	def test_memory_db(self):
+		with pytest.raises(ValueError):
+			Sqlite_Pool(':memory:')
+
+
+if __name__ == '__main__':
+	pytest.main()
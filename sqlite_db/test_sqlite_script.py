@@ -3,9 +3,14 @@ import sys
 #adds the top level directory to the path
 PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(PATH)
+import csv
+import gzip
 import sqlite3
 import pytest
+from array import array
 from sqlite_db.sqlite_script import Sqlite_Connection
+from templates import query_string as qs
+from templates import row_data
 from shutil import rmtree
 
 @pytest.fixture(scope='module')
@@ -137,6 +142,53 @@ class Test_Drop_Table:
 			assert len([table[0] for table in new_conn.all_tables()]) == 0
 
 
+class Test_Schema_Cache:
+	def test_cached_until_ddl(self, db_conn):
+		with db_conn:
+			db_conn.create_table('test_cache', [('id', 'INTEGER')])
+			assert ['test_cache'] == [table[0] for table in db_conn.all_tables()]
+			assert db_conn._schema['tables'] == [('test_cache',)]
+			assert ['id'] == [field[1] for field in db_conn.db_fields('test_cache')]
+			db_conn.drop_table('test_cache')
+			assert [] == list(db_conn.all_tables())
+
+	def test_schema_version_change(self, db_conn, set_up_db):
+		with db_conn:
+			db_conn.create_table('test_cache', [('id', 'INTEGER')])
+			assert ['id'] == [field[1] for field in db_conn.db_fields('test_cache')]
+			#DDL from another connection
+			with Sqlite_Connection(set_up_db) as other:
+				other.cur.execute('ALTER TABLE test_cache ADD COLUMN name TEXT')
+			#hits aren't checked, the next miss sees the new schema_version and drops the cache
+			assert ['id'] == [field[1] for field in db_conn.db_fields('test_cache')]
+			list(db_conn.all_tables())
+			assert ['id', 'name'] == [field[1] for field in db_conn.db_fields('test_cache')]
+			db_conn.drop_table('test_cache')
+
+	def test_hits_run_no_query(self, db_conn):
+		with db_conn:
+			db_conn.create_table('test_cache', [('id', 'INTEGER')])
+			list(db_conn.db_fields('test_cache'))
+			statements = []
+			db_conn.conn.set_trace_callback(statements.append)
+			list(db_conn.db_fields('test_cache'))
+			db_conn.conn.set_trace_callback(None)
+			assert statements == []
+			#DDL run straight on the cursor, temp schema included, drops the cache too
+			db_conn.cur.execute('ALTER TABLE test_cache ADD COLUMN name TEXT')
+			assert ['id', 'name'] == [field[1] for field in db_conn.db_fields('test_cache')]
+			db_conn.cur.execute('CREATE TEMP TABLE test_cache (age INTEGER)')
+			assert ['age'] == [field[1] for field in db_conn.db_fields('test_cache')]
+			db_conn.cur.execute('DROP TABLE temp.test_cache')
+			db_conn.drop_table('test_cache')
+			assert [] == list(db_conn.all_tables())
+
+	def test_disabled(self, set_up_db):
+		with Sqlite_Connection(set_up_db, schema_cache=False) as conn:
+			assert [] == list(conn.all_tables())
+			assert conn._schema == {}
+
+
 class Test_Insert_Data_Default:
 	def test_single_field_single_insert(self, test_table, select_all):
 		fields = [{'field':'age', 'data_type':'INTEGER'},]
@@ -224,6 +276,622 @@ class Test_Insert_Data_From_Dict:
 
 
 
+class Test_Insert_Multi_Row:
+	def test_multi_row(self, test_table, select_all):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		data = [(i, f'name_{i}') for i in range(1234)]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('age', 'name'), data, multi_row=True)
+			assert data == list(new_conn.cur.execute(select_all(table_name)))
+
+	@pytest.mark.parametrize('bad', [700, 1200])
+	def test_trusted_wrong_width(self, test_table, bad):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		data = [(i, f'name_{i}') for i in range(1234)]
+		#one short row and one long row would still add up to the right number of values
+		data[bad], data[bad + 1] = (bad,), (bad, 'name', 'extra')
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			with pytest.raises(ValueError) as err:
+				new_conn.insert_into(table_name, ('age', 'name'), data, trusted=True, multi_row=True)
+			assert str(err.value) == f'row {bad} has 2 feild(s) and 1 inputs'
+
+	def test_multi_row_from_dict(self, test_table, select_all):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, data_dict={'age':list(range(3))}, multi_row=True)
+			assert [(0,), (1,), (2,)] == list(new_conn.cur.execute(select_all(table_name)))
+
+
+class Test_Insert_Upsert:
+	@pytest.fixture(scope='function')
+	def keyed_table(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER', 'extra':'PRIMARY KEY'}, 
+											{'field':'name', 'data_type':'TEXT'}])
+		new_conn.insert_into(table_name, ('id', 'name'), [(1, 'Tom'), (2, 'Bob')])
+		with new_conn:
+			yield new_conn, table_name
+
+	def test_do_update(self, keyed_table, select_all):
+		new_conn, table_name = keyed_table
+		new_conn.insert_into(table_name, ('id', 'name'), [(2, 'Ann'), (3, 'Sue')], 
+							on_conflict=('id',), update_fields=('name',))
+		assert [(1, 'Tom'), (2, 'Ann'), (3, 'Sue')] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_do_nothing(self, keyed_table, select_all):
+		new_conn, table_name = keyed_table
+		new_conn.insert_into(table_name, ('id', 'name'), [(2, 'Ann'), (3, 'Sue')], on_conflict=('id',))
+		assert [(1, 'Tom'), (2, 'Bob'), (3, 'Sue')] == list(new_conn.cur.execute(select_all(table_name)))
+
+	@pytest.mark.parametrize('resolve, name', [('REPLACE', 'Ann'), ('IGNORE', 'Bob')])
+	def test_resolve(self, keyed_table, select_all, resolve, name):
+		new_conn, table_name = keyed_table
+		new_conn.insert_into(table_name, ('id', 'name'), (2, 'Ann'), resolve=resolve)
+		assert [(1, 'Tom'), (2, name)] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_multi_row_duplicates(self, keyed_table, select_all):
+		new_conn, table_name = keyed_table
+		data = [(i % 50, f'name_{i}') for i in range(1000)]
+		new_conn.insert_into(table_name, ('id', 'name'), data, multi_row=True, 
+							on_conflict=('id',), update_fields=('name',))
+		assert [(i, f'name_{950 + i}') for i in range(50)] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_stream(self, keyed_table, select_all):
+		new_conn, table_name = keyed_table
+		rows = ((i, 'new') for i in range(5))
+		new_conn.insert_stream(table_name, ('id', 'name'), rows, chunk_size=2, on_conflict=('id',))
+		assert [(1, 'Tom'), (2, 'Bob')] == list(new_conn.cur.execute(select_all(table_name) + ' WHERE id IN (1, 2)'))
+		assert 5 == len(list(new_conn.cur.execute(select_all(table_name))))
+
+
+class Test_Insert_Columnar:
+	def test_array_columns(self, test_table, select_all):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'score', 'data_type':'REAL'}]
+		data_dict = {'age':array('q', [9, 10, 11]), 'score':array('d', [0.5, 1.5, 2.5])}
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, data_dict=data_dict)
+			assert [(9, 0.5), (10, 1.5), (11, 2.5)] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_numpy_like_columns_convert_in_chunks(self, test_table, select_all, monkeypatch):
+		class Column(array):
+			#stands in for a numpy array: has a dtype and converts itself with tolist
+			dtype = 'int64'
+			converted = []
+			def __getitem__(self, key):
+				return Column('q', array.__getitem__(self, key))
+			def tolist(self):
+				self.converted.append(len(self))
+				return array.tolist(self)
+		monkeypatch.setattr(row_data, 'TOLIST_CHUNK', 4)
+		new_conn, table_name = test_table([{'field':'age', 'data_type':'INTEGER'}])
+		with new_conn:
+			new_conn.insert_into(table_name, data_dict={'age':Column('q', range(10))})
+			assert [(i,) for i in range(10)] == list(new_conn.cur.execute(select_all(table_name)))
+		assert Column.converted == [4, 4, 2]
+
+	def test_uneven_columns(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			with pytest.raises(ValueError) as err:
+				new_conn.insert_into(table_name, data_dict={'age':[1, 2], 'name':['Tom']})
+			assert str(err.value) == 'Ensure that each field has a list of data of the same lenght'
+
+
+class Test_Insert_Stream:
+	def test_generator(self, test_table, select_all):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		new_conn, table_name = test_table(fields)
+		rows = ((i, f'name_{i}') for i in range(25))
+		with new_conn:
+			count = new_conn.insert_stream(table_name, ('age', 'name'), rows, chunk_size=10)
+			assert count == 25
+			assert [(i, f'name_{i}') for i in range(25)] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_invalid_row_rolls_back(self, test_table, select_all):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		rows = iter([(1,), (2,), (3, 4)])
+		with new_conn:
+			with pytest.raises(ValueError) as err:
+				new_conn.insert_stream(table_name, ('age',), rows, chunk_size=1)
+			assert str(err.value) == 'row 2 has 1 feild(s) and 2 inputs'
+			assert [] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_invalid_row_keeps_open_transaction(self, test_table, select_all):
+		new_conn, table_name = test_table([{'field':'age', 'data_type':'INTEGER'},])
+		with new_conn:
+			new_conn.insert_into(table_name, ('age',), (0,))
+			with pytest.raises(ValueError):
+				new_conn.insert_stream(table_name, ('age',), iter([(1,), (2, 3)]), chunk_size=1)
+			assert new_conn.conn.in_transaction
+			assert [(0,)] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_non_tuple_row(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			with pytest.raises(TypeError) as err:
+				new_conn.insert_stream(table_name, ('age',), [(1,), [2]])
+			assert str(err.value) == 'row 1 is a list, rows must be tuples'
+
+
+class Test_Update:
+	@pytest.fixture(scope='function')
+	def filled_table(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER'}, {'field':'age', 'data_type':'INTEGER'},
+											{'field':'name', 'data_type':'TEXT'}])
+		new_conn.insert_into(table_name, ('id', 'age', 'name'), [(i, i, 'old') for i in range(1000)])
+		new_conn.conn.commit()
+		with new_conn:
+			yield new_conn, table_name
+
+	def test_executemany(self, filled_table):
+		new_conn, table_name = filled_table
+		rows = ((-i, 'new', i) for i in range(0, 1000, 2))
+		assert 500 == new_conn.update(table_name, ('age', 'name'), 'id', rows, batch_size=64)
+		assert not new_conn.conn.in_transaction
+		assert (1, 'old') == new_conn.cur.execute(f'SELECT age, name FROM {table_name} WHERE id = 1').fetchone()
+		assert (-2, 'new') == new_conn.cur.execute(f'SELECT age, name FROM {table_name} WHERE id = 2').fetchone()
+
+	@pytest.mark.parametrize('join', [True, False])
+	def test_temp_table(self, filled_table, monkeypatch, join):
+		new_conn, table_name = filled_table
+		if not join:
+			monkeypatch.setattr(sqlite3, 'sqlite_version_info', (3, 32, 0))
+		rows = ((-i, 'new', i) for i in range(0, 1000, 2))
+		assert 500 == new_conn.update(table_name, ('age', 'name'), 'id', rows, batch_size=64, temp_table_threshold=10)
+		expected = [(i, -i if i % 2 == 0 else i, 'new' if i % 2 == 0 else 'old') for i in range(1000)]
+		assert expected == list(new_conn.cur.execute(f'SELECT * FROM {table_name} ORDER BY id'))
+		assert [] == list(new_conn.cur.execute("SELECT name FROM sqlite_temp_master WHERE type='table'"))
+
+	def test_rollback(self, filled_table):
+		new_conn, table_name = filled_table
+		rows = [(-1, 'new', 1)] * 20 + [(-1, 2)]
+		with pytest.raises(sqlite3.ProgrammingError):
+			new_conn.update(table_name, ('age', 'name'), 'id', rows, temp_table_threshold=10)
+		assert not new_conn.conn.in_transaction
+		assert [] == list(new_conn.cur.execute(f"SELECT * FROM {table_name} WHERE name = 'new'"))
+		assert [] == list(new_conn.cur.execute("SELECT name FROM sqlite_temp_master WHERE type='table'"))
+
+	def test_rollback_open_transaction(self, filled_table):
+		new_conn, table_name = filled_table
+		#insert_into doesn't commit, so the temp table is created inside this transaction
+		new_conn.insert_into(table_name, ('id', 'age', 'name'), (1000, 0, 'old'))
+		rows = [(-1, 'new', 1)] * 20 + [(-1, 2)]
+		with pytest.raises(sqlite3.ProgrammingError):
+			new_conn.update(table_name, ('age', 'name'), 'id', rows, temp_table_threshold=10)
+		assert [] == list(new_conn.cur.execute("SELECT name FROM sqlite_temp_master WHERE type='table'"))
+		#only the update is rolled back, the caller's row is still pending
+		assert new_conn.conn.in_transaction
+		assert [(1000, 0, 'old')] == list(new_conn.cur.execute(f'SELECT * FROM {table_name} WHERE id = 1000'))
+
+	def test_open_transaction_left_to_caller(self, filled_table):
+		new_conn, table_name = filled_table
+		new_conn.insert_into(table_name, ('id', 'age', 'name'), (1000, 0, 'old'))
+		assert 1 == new_conn.update(table_name, ('age',), 'id', [(-1, 1)])
+		assert new_conn.conn.in_transaction
+		new_conn.conn.rollback()
+		assert [(1, 'old')] == list(new_conn.cur.execute(f'SELECT age, name FROM {table_name} WHERE id = 1'))
+		assert [] == list(new_conn.cur.execute(f'SELECT * FROM {table_name} WHERE id = 1000'))
+
+
+class Test_Select:
+	def test_select_all(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		data = [(9, 'Tom'),(10, 'Bob'), (11, 'Jack'), (12, 'Yacin')]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('age', 'name'), data)
+			assert data == list(new_conn.select(table_name, batch_size=3))
+
+	def test_select_condition(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		data = [(9, 'Tom'),(10, 'Bob'), (11, 'Jack'), (12, 'Yacin')]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('age', 'name'), data)
+			rows = new_conn.select(table_name, ('name',), (10,), search_condition=('age',), 
+									operator=('>',), order_by=('age',), order=('DESC',))
+			assert [('Yacin',), ('Jack',)] == list(rows)
+
+	def test_concurrent_iterations(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('age',), [(i,) for i in range(5)])
+			outer = new_conn.select(table_name, new_cursor=True, batch_size=2)
+			pairs = [(a, b) for (a,) in outer for (b,) in new_conn.select(table_name, new_cursor=True)]
+			assert len(pairs) == 25
+
+	def test_custom_sql(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('age',), [(1,), (2,)])
+			assert [(3,)] == list(new_conn.select(custom_sql=f'SELECT sum(age) FROM {table_name}'))
+
+
+class Test_Row_Factory:
+	@pytest.mark.parametrize('factory', ['row', 'slots'])
+	def test_rows(self, set_up_db, factory):
+		with Sqlite_Connection(set_up_db, row_factory=factory) as conn:
+			conn.create_table('test_rows', [('id', 'INTEGER'), ('name', 'TEXT')])
+			conn.insert_into('test_rows', ('id', 'name'), [(1, 'Tom'), (2, 'Bob')])
+			rows = list(conn.select('test_rows', ('id', 'name'), (1,), search_condition=('id',), operator=('>',)))
+			assert [(2, 'Bob')] == [tuple(row) for row in rows]
+			assert rows[0]['name'] == 'Bob'
+			assert 'test_rows' in [row['name'] for row in conn.all_tables()]
+			assert [[1, 2]] == [[row['id'] for row in page] for page in conn.paginate('test_rows', ('id',))]
+			conn.drop_table('test_rows')
+
+	def test_set_row_factory(self, db_conn):
+		with db_conn:
+			db_conn.set_row_factory('slots')
+			assert db_conn.cur.execute('SELECT 1 AS one').fetchone().one == 1
+			db_conn.set_row_factory('tuple')
+			assert db_conn.cur.execute('SELECT 1 AS one').fetchone() == (1,)
+
+
+class Test_Select_Columns:
+	def test_columns(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}])
+		with new_conn:
+			new_conn.set_row_factory('slots')
+			new_conn.insert_into(table_name, ('id', 'name'), [(i, f'name_{i}') for i in range(10)])
+			columns = new_conn.select_columns(table_name, ('id', 'name'), (5,), batch_size=3, 
+												search_condition=('id',), operator=('<',))
+			assert columns == {'id':array('q', range(5)), 'name':[f'name_{i}' for i in range(5)]}
+
+
+class Test_Paginate:
+	def test_pages(self, test_table):
+		fields = [{'field':'id', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('id', 'name'), [(i, f'name_{i}') for i in range(10)])
+			pages = list(new_conn.paginate(table_name, ('id',), page_size=4))
+			assert [len(page) for page in pages] == [4, 4, 2]
+			assert [row[0] for page in pages for row in page] == list(range(10))
+
+	def test_composite_key_desc_with_condition(self, test_table):
+		fields = [{'field':'grp', 'data_type':'INTEGER'}, {'field':'id', 'data_type':'INTEGER'}]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			new_conn.insert_into(table_name, ('grp', 'id'), [(i % 3, i) for i in range(12)])
+			pages = new_conn.paginate(table_name, ('grp', 'id'), page_size=3, order=('DESC', 'DESC'), 
+										params=(0,), search_condition=('grp',), operator=('>',))
+			rows = [row for page in pages for row in page]
+			assert rows == sorted([(i % 3, i) for i in range(12) if i % 3 > 0], reverse=True)
+
+	def test_key_must_be_selected(self, test_table):
+		fields = [{'field':'id', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			with pytest.raises(ValueError):
+				list(new_conn.paginate(table_name, ('id',), fields=('name',)))
+
+
+class Test_Delete:
+	@pytest.fixture(scope='function')
+	def filled_table(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER'}, {'field':'age', 'data_type':'INTEGER'}])
+		new_conn.insert_into(table_name, ('id', 'age'), [(i, i % 10) for i in range(1000)])
+		new_conn.conn.commit()
+		with new_conn:
+			yield new_conn, table_name
+
+	def count(self, conn, table_name):
+		return conn.cur.execute(f'SELECT count(*) FROM {table_name}').fetchone()[0]
+
+	def test_condition(self, filled_table):
+		new_conn, table_name = filled_table
+		assert 100 == new_conn.delete(table_name, (0,), search_condition=('age',))
+		assert 900 == self.count(new_conn, table_name)
+
+	def test_chunked(self, filled_table):
+		new_conn, table_name = filled_table
+		new_conn.cur.execute(f'DELETE FROM {table_name} WHERE id % 7 = 0')
+		new_conn.conn.commit()
+		assert 428 == new_conn.delete(table_name, (5,), chunk_size=64, search_condition=('age',), operator=('<',))
+		assert not new_conn.conn.in_transaction
+		assert [] == list(new_conn.cur.execute(f'SELECT * FROM {table_name} WHERE age < 5 OR id % 7 = 0'))
+		assert 429 == self.count(new_conn, table_name)
+
+	def test_chunked_sparse_rowids(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER', 'extra':'PRIMARY KEY'}])
+		with new_conn:
+			new_conn.insert_into(table_name, ('id',), [(1,), (2,), (4000000,), (2**62,), (2**62 + 1,)])
+			new_conn.conn.commit()
+			commits = []
+			#with no transaction open each RELEASE of a chunk's savepoint commits it
+			new_conn.conn.set_trace_callback(lambda sql: commits.append(sql) if sql.startswith('RELEASE') else None)
+			assert 3 == new_conn.delete(table_name, (2,), chunk_size=2, search_condition=('id',), operator=('>',))
+			new_conn.conn.set_trace_callback(None)
+			#ranges (1, 2), (4000000, 2**62), (2**62 + 1, 2**62 + 1)
+			assert len(commits) == 3
+			assert [(1,), (2,)] == list(new_conn.cur.execute(f'SELECT id FROM {table_name}'))
+
+	def test_chunked_max_rowid(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER', 'extra':'PRIMARY KEY'}])
+		with new_conn:
+			new_conn.insert_into(table_name, ('id',), [(1,), (2**63 - 2,), (2**63 - 1,)])
+			assert 3 == new_conn.delete(table_name, chunk_size=1)
+			assert [] == list(new_conn.cur.execute(f'SELECT id FROM {table_name}'))
+
+	def test_chunked_empty_table(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER'}])
+		with new_conn:
+			assert 0 == new_conn.delete(table_name, chunk_size=10)
+
+	def test_keys(self, filled_table):
+		new_conn, table_name = filled_table
+		assert 500 == new_conn.delete_keys(table_name, 'id', (i for i in range(0, 2000, 2)), chunk_size=300)
+		assert not new_conn.conn.in_transaction
+		assert 500 == self.count(new_conn, table_name)
+		#insert_into, IN with 300 and with 100 keys
+		assert new_conn.statement_info()['statements'] == 3
+
+
+class Test_Index:
+	@pytest.fixture(scope='function')
+	def filled_table(self, test_table):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER'}, {'field':'age', 'data_type':'INTEGER'}])
+		new_conn.insert_into(table_name, ('id', 'age'), [(i, i % 10) for i in range(1000)])
+		new_conn.conn.commit()
+		with new_conn:
+			yield new_conn, table_name
+
+	def test_create_drop(self, filled_table):
+		new_conn, table_name = filled_table
+		name = new_conn.create_index(table_name, ('age',))
+		assert [name] == [index for index, _ in new_conn.indexes(table_name)]
+		new_conn.drop_index(name)
+		assert [] == new_conn.indexes(table_name)
+
+	def test_explain(self, filled_table):
+		new_conn, table_name = filled_table
+		sql = qs.select(table_name, ('id',), ('age',))
+		assert ['SCAN'] == [step.detail.split()[0] for step in new_conn.explain(sql, (1,))]
+		new_conn.create_index(table_name, ('age',))
+		detail = new_conn.explain(sql, (1,))[0].detail
+		assert detail.startswith('SEARCH') and 'test_table_age_idx' in detail
+
+	def test_advise(self, filled_table, caplog):
+		new_conn, table_name = filled_table
+		sql = qs.select(table_name, ('id',), ('age',))
+		assert [] == new_conn.advise(sql, (1,))
+		flagged = new_conn.advise(sql, (1,), min_rows=1000)
+		assert [(table_name, 1000)] == [(step['table'], step['rows']) for step in flagged]
+		assert 'consider an index' in caplog.text
+		new_conn.create_index(table_name, ('age',))
+		assert [] == new_conn.advise(sql, (1,), min_rows=1000)
+
+	def test_row_estimate(self, filled_table):
+		new_conn, table_name = filled_table
+		new_conn.cur.execute(f'CREATE VIEW test_view AS SELECT * FROM {table_name}')
+		try:
+			assert new_conn._row_estimate('test_view') is None
+			new_conn.create_index(table_name, ('age',))
+			new_conn.cur.execute('ANALYZE')
+			new_conn.delete(table_name, (500,), search_condition=('id',), operator=('>=',))
+			#sqlite_stat1 keeps the count of the last ANALYZE
+			assert 1000 == new_conn._row_estimate(table_name)
+		finally:
+			new_conn.cur.execute('DROP VIEW test_view')
+			new_conn.cur.execute('DROP TABLE IF EXISTS sqlite_stat1')
+			new_conn.conn.commit()
+		assert 500 == new_conn._row_estimate(table_name)
+
+	def test_deferred_indexes(self, filled_table):
+		new_conn, table_name = filled_table
+		new_conn.create_index(table_name, ('age',))
+		new_conn.create_index(table_name, ('id',), unique=True)
+		before = new_conn.indexes(table_name)
+		with pytest.raises(ValueError):
+			with new_conn.deferred_indexes(table_name) as dropped:
+				assert ['test_table_age_idx'] == [name for name, _ in dropped]
+				assert ['test_table_id_idx'] == [name for name, _ in new_conn.indexes(table_name)]
+				new_conn.insert_stream(table_name, ('id', 'age'), ((i, 0) for i in range(1000, 2000)))
+				#not commited, rolled back when the block raises
+				new_conn.insert_into(table_name, ('id', 'age'), [(i, 0) for i in range(2000, 3000)])
+				raise ValueError
+		assert sorted(before) == sorted(new_conn.indexes(table_name))
+		assert 2000 == new_conn.cur.execute(f'SELECT count(*) FROM {table_name} WHERE age >= 0').fetchone()[0]
+
+	def test_deferred_unique_index(self, filled_table):
+		new_conn, table_name = filled_table
+		new_conn.create_index(table_name, ('id',), unique=True)
+		with pytest.raises(sqlite3.IntegrityError):
+			with new_conn.deferred_indexes(table_name):
+				new_conn.insert_into(table_name, ('id', 'age'), (1, 1))
+		assert ['test_table_id_idx'] == [name for name, _ in new_conn.indexes(table_name)]
+
+	def test_deferred_rebuild_failure(self, filled_table):
+		new_conn, table_name = filled_table
+		new_conn.create_index(table_name, ('age',))
+		new_conn.create_index(table_name, ('id',))
+		with pytest.raises(sqlite3.DatabaseError, match='indexes not restored: test_table_age_idx'):
+			with new_conn.deferred_indexes(table_name):
+				new_conn.cur.execute(f'ALTER TABLE {table_name} RENAME COLUMN age TO years')
+		assert ['test_table_id_idx'] == [name for name, _ in new_conn.indexes(table_name)]
+
+	def test_deferred_rebuild_failure_keeps_error(self, filled_table, caplog):
+		new_conn, table_name = filled_table
+		new_conn.create_index(table_name, ('age',))
+		with pytest.raises(KeyError):
+			with new_conn.deferred_indexes(table_name):
+				new_conn.cur.execute(f'ALTER TABLE {table_name} RENAME COLUMN age TO years')
+				raise KeyError
+		assert 'indexes not restored: test_table_age_idx' in caplog.text
+
+
+class Test_Table_To_Csv:
+	def test_export(self, test_table, tmp_path):
+		fields = [{'field':'age', 'data_type':'INTEGER'}, {'field':'name', 'data_type':'TEXT'}]
+		data = [(9, 'Tom'),(10, 'Bob'), (11, 'Jack')]
+		new_conn, table_name = test_table(fields)
+		csv_path = str(tmp_path / 'export.csv')
+		with new_conn:
+			new_conn.insert_into(table_name, ('age', 'name'), data)
+			stats = new_conn.table_to_csv(table_name, csv_path, batch_size=2)
+		assert stats['rows'] == 3
+		assert stats['bytes'] == os.path.getsize(csv_path)
+		with open(csv_path, newline='') as f:
+			assert list(csv.reader(f)) == [['age', 'name'], ['9', 'Tom'], ['10', 'Bob'], ['11', 'Jack']]
+
+	def test_gzip(self, test_table, tmp_path):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		csv_path = str(tmp_path / 'export.csv.gz')
+		with new_conn:
+			new_conn.insert_into(table_name, ('age',), [(1,), (2,)])
+			new_conn.table_to_csv(table_name, csv_path, header=False)
+		with gzip.open(csv_path, 'rt', newline='') as f:
+			assert list(csv.reader(f)) == [['1'], ['2']]
+
+	def test_shards(self, test_table, tmp_path):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		csv_path = str(tmp_path / 'export.csv')
+		with new_conn:
+			new_conn.insert_into(table_name, ('age',), [(i,) for i in range(10)])
+			new_conn.conn.commit()
+			stats = new_conn.table_to_csv(table_name, csv_path, shards=3, header=False)
+		assert stats['rows'] == 10
+		assert [os.path.basename(f) for f in stats['files']] == ['export_0.csv', 'export_1.csv', 'export_2.csv']
+		rows = []
+		for path in stats['files']:
+			with open(path, newline='') as f:
+				rows.extend(int(row[0]) for row in csv.reader(f))
+		assert rows == list(range(10))
+
+	def test_shards_split_on_row_count(self, test_table, tmp_path):
+		new_conn, table_name = test_table([{'field':'id', 'data_type':'INTEGER', 'extra':'PRIMARY KEY'}])
+		csv_path = str(tmp_path / 'export.csv')
+		with new_conn:
+			ids = [1, 2, 3, 4, 5, 10**6, 2**62, 2**63 - 1]
+			new_conn.insert_into(table_name, ('id',), [(i,) for i in ids])
+			new_conn.conn.commit()
+			assert new_conn._rowid_ranges(table_name, 3) == [(1, 3), (4, 10**6), (2**62, 2**63 - 1)]
+			stats = new_conn.table_to_csv(table_name, csv_path, shards=3, header=False)
+		assert stats['rows'] == 8
+		counts = []
+		for path in stats['files']:
+			with open(path, newline='') as f:
+				counts.append(len(list(csv.reader(f))))
+		assert counts == [3, 3, 2]
+
+	def test_shards_refuse_open_transaction(self, test_table, tmp_path):
+		new_conn, table_name = test_table([{'field':'age', 'data_type':'INTEGER'},])
+		with new_conn:
+			new_conn.insert_into(table_name, ('age',), (1,))
+			with pytest.raises(ValueError):
+				new_conn.table_to_csv(table_name, str(tmp_path / 'export.csv'), shards=2)
+			assert new_conn.conn.in_transaction
+
+	def test_shards_without_rowid(self, db_conn, tmp_path):
+		with db_conn:
+			db_conn.create_table(custom_sql='CREATE TABLE test_no_rowid (id INTEGER PRIMARY KEY) WITHOUT ROWID;')
+			try:
+				with pytest.raises(ValueError) as err:
+					db_conn.table_to_csv('test_no_rowid', str(tmp_path / 'export.csv'), shards=2)
+				assert 'WITHOUT ROWID' in str(err.value)
+			finally:
+				db_conn.drop_table('test_no_rowid')
+
+
+class Test_Csv_To_Table:
+	def test_import(self, db_conn, tmp_path, select_all):
+		csv_path = tmp_path / 'import.csv'
+		csv_path.write_text('id,score,name,empty\n1,1.5,Tom,\n2,,Bob,\n3,2,,\n')
+		with db_conn:
+			count = db_conn.csv_to_table(str(csv_path), 'test_import', chunk_size=2)
+			assert count == 3
+			types = [(row[1], row[2]) for row in db_conn.db_fields('test_import')]
+			assert types == [('id', 'INTEGER'), ('score', 'REAL'), ('name', 'TEXT'), ('empty', '')]
+			rows = list(db_conn.cur.execute(select_all('test_import')))
+			assert rows == [(1, 1.5, 'Tom', None), (2, None, 'Bob', None), (3, 2.0, None, None)]
+			db_conn.drop_table('test_import')
+
+	def test_leading_zeros_stay_text(self, db_conn, tmp_path, select_all):
+		csv_path = tmp_path / 'import.csv'
+		csv_path.write_text('zip,id,code,big,score,exp,dot\n02134,007,+5,99999999999999999999,-0.5,1e5,.5\n'
+							'90210,12,6,1,2.25,2,e5\n')
+		with db_conn:
+			db_conn.csv_to_table(str(csv_path), 'test_import')
+			types = [row[2] for row in db_conn.db_fields('test_import')]
+			assert types == ['TEXT', 'TEXT', 'TEXT', 'TEXT', 'REAL', 'TEXT', 'TEXT']
+			rows = list(db_conn.cur.execute(select_all('test_import')))
+			assert rows[0] == ('02134', '007', '+5', '99999999999999999999', -0.5, '1e5', '.5')
+			assert rows[1][4:] == (2.25, '2', 'e5')
+			db_conn.drop_table('test_import')
+
+	def test_gzip_without_header(self, db_conn, tmp_path, select_all):
+		csv_path = str(tmp_path / 'import.csv.gz')
+		with gzip.open(csv_path, 'wt') as f:
+			f.write('1|a\n2|b\n')
+		with db_conn:
+			db_conn.csv_to_table(csv_path, 'test_import', fields=('id', 'name'), header=False, 
+								types={'id':'TEXT'}, delimiter='|')
+			assert [('1', 'a'), ('2', 'b')] == list(db_conn.cur.execute(select_all('test_import')))
+			db_conn.drop_table('test_import')
+
+	def test_bulk_pragmas_are_restored(self, db_conn):
+		with db_conn:
+			synchronous = db_conn.cur.execute('PRAGMA synchronous;').fetchone()[0]
+			with db_conn.bulk_load_pragmas():
+				assert db_conn.cur.execute('PRAGMA synchronous;').fetchone()[0] == 0
+				assert db_conn.cur.execute('PRAGMA journal_mode;').fetchone()[0] == 'memory'
+			assert db_conn.cur.execute('PRAGMA synchronous;').fetchone()[0] == synchronous
+			assert db_conn.cur.execute('PRAGMA journal_mode;').fetchone()[0] == 'delete'
+
+	def test_bulk_pragmas_roll_back_on_error(self, test_table, select_all):
+		new_conn, table_name = test_table([{'field':'age', 'data_type':'INTEGER'}])
+		with new_conn:
+			synchronous = new_conn.cur.execute('PRAGMA synchronous;').fetchone()[0]
+			with pytest.raises(KeyError):
+				with new_conn.bulk_load_pragmas():
+					new_conn.insert_into(table_name, ('age',), [(1,), (2,)])
+					raise KeyError
+			assert [] == list(new_conn.cur.execute(select_all(table_name)))
+			assert new_conn.cur.execute('PRAGMA synchronous;').fetchone()[0] == synchronous
+			new_conn.insert_into(table_name, ('age',), (3,))
+			with pytest.raises(ValueError):
+				with new_conn.bulk_load_pragmas():
+					pass
+
+
+class Test_Statement_Registry:
+	def test_repeated_inserts_reuse_statement(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			for i in range(5):
+				new_conn.insert_into(table_name, ('age',), (i,))
+			new_conn.insert_stream(table_name, ('age',), [(5,)])
+			info = new_conn.statement_info()
+			assert info['misses'] == 1
+			assert info['hits'] == 5
+			assert info['statements'] == 1
+
+	def test_trusted_list_fields(self, test_table, select_all):
+		new_conn, table_name = test_table([{'field':'age', 'data_type':'INTEGER'},])
+		with new_conn:
+			new_conn.insert_into(table_name, ['age'], [(1,)], trusted=True)
+			new_conn.insert_into(table_name, ['age'], [(2,), (3,)], trusted=True, multi_row=True)
+			assert [(1,), (2,), (3,)] == list(new_conn.cur.execute(select_all(table_name)))
+
+	def test_registry_is_bounded(self, set_up_db):
+		with Sqlite_Connection(set_up_db, cached_statements=2) as conn:
+			for table in ('a', 'b', 'c', 'a'):
+				list(conn.db_fields(table))
+			assert conn.statement_info() == {'hits':0, 'misses':4, 'statements':2, 'cached_statements':2}
+
+
 class Test_Insert_Data_Erros:
 	def test_feild_error_non_tuple(self, test_table):
 		fields = [{'field':'age', 'data_type':'INTEGER'},]
@@ -267,6 +935,37 @@ class Test_Insert_Data_Erros:
 		assert str(err.value) == ('\nrow 2 has 1 feild(s) and 2 inputs'
 								'\nrow 3 has 1 feild(s) and 3 inputs')
 
+	def test_error_report_is_bounded(self, test_table):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with pytest.raises(ValueError) as err:
+			with new_conn:
+				new_conn.insert_into(table_name, (fields[0]['field'],), [(1, 2)] * 100)
+		lines = str(err.value).split('\n')[1:]
+		assert len(lines) == 11
+		assert lines[-1] == '... stopped after 10 invalid rows'
+
+	def test_error_in_later_chunk(self, monkeypatch):
+		monkeypatch.setattr(row_data, 'VALIDATION_CHUNK', 4)
+		data = [(1,)] * 9 + [(1, 2)] + [(1,)] * 5 + [(1, 2, 3)]
+		with pytest.raises(ValueError) as err:
+			Sqlite_Connection._valid_field_data(('age',), data)
+		assert str(err.value) == ('\nrow 9 has 1 feild(s) and 2 inputs'
+								'\nrow 15 has 1 feild(s) and 3 inputs')
+		with pytest.raises(TypeError):
+			Sqlite_Connection._valid_field_data(('age',), data[:9] + [[1]])
+
+
+class Test_Insert_Trusted:
+	def test_trusted_skips_validation(self, test_table, select_all):
+		fields = [{'field':'age', 'data_type':'INTEGER'},]
+		new_conn, table_name = test_table(fields)
+		with new_conn:
+			#lists would be rejected by the validator, sqlite3 accepts any sequence
+			new_conn.insert_into(table_name, ('age',), [[1], [2]], trusted=True)
+			new_conn.insert_stream(table_name, ('age',), ([i] for i in (3, 4)), trusted=True)
+			assert [(1,), (2,), (3,), (4,)] == list(new_conn.cur.execute(select_all(table_name)))
+
 
 
 
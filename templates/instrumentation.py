@@ -0,0 +1,124 @@
+'''
+Timing hooks for building and executing queries.
+
+Sqlite_Connection reports a Query_Event for each call to the active collector:
+	operation: the method name ex) 'insert_into', 'select'
+	table: the db table
+	render_time: seconds spent building the sql string
+	execute_time: seconds spent in cursor.execute/executemany
+	row_count: rows written, as reported by the cursor (-1 when unknown, ex) select)
+	batch_size: number of parameter rows sent with the statement
+
+The default collector is a no-op, callers check collector.enabled before timing anything.
+
+from templates import instrumentation
+histogram = instrumentation.set_collector(instrumentation.Histogram_Collector())
+...
+histogram.summary()
+'''
+import bisect
+import logging
+import threading
+from collections import namedtuple
+
+Query_Event = namedtuple('Query_Event', 'operation table render_time execute_time row_count batch_size')
+
+# upper bounds in seconds of the Histogram_Collector buckets, from 10us to 10s
+BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 1e-1, 5e-1, 1.0, 5.0, 10.0)
+
+
+class Null_Collector:
+	'''does nothing, nothing is timed while it is the active collector'''
+	enabled = False
+
+	def record(self, event):
+		pass
+
+
+class Histogram_Collector:
+	'''keeps an in memory histogram of the render and execute times of each operation'''
+	enabled = True
+
+	def __init__(self, buckets=BUCKETS):
+		self.buckets = tuple(buckets)
+		self._lock = threading.Lock()
+		self.clear()
+
+	def clear(self):
+		self._stats = {}
+
+	def _add(self, key, seconds):
+		stats = self._stats.get(key)
+		if stats is None:
+			stats = self._stats[key] = {'count':0, 'total':0.0, 'max':0.0,
+										'histogram':[0] * (len(self.buckets) + 1)}
+		stats['count'] += 1
+		stats['total'] += seconds
+		stats['max'] = max(stats['max'], seconds)
+		stats['histogram'][bisect.bisect_left(self.buckets, seconds)] += 1
+
+	def record(self, event):
+		with self._lock:
+			self._add((event.operation, 'render'), event.render_time)
+			self._add((event.operation, 'execute'), event.execute_time)
+
+	def percentile(self, operation, phase, percent):
+		'''
+		upper bound of the bucket holding the percent-th percentile of an operation's
+		'render' or 'execute' times, inf if it's past the last bucket
+		'''
+		stats = self._stats.get((operation, phase))
+		if not stats:
+			return None
+		target = stats['count'] * percent / 100
+		seen = 0
+		for bound, count in zip(self.buckets + (float('inf'),), stats['histogram']):
+			seen += count
+			if seen >= target:
+				return bound
+
+	def summary(self):
+		'''returns {(operation, phase): {'count', 'total', 'mean', 'max', 'p50', 'p99', 'histogram'}}'''
+		with self._lock:
+			summary = {}
+			for (operation, phase), stats in self._stats.items():
+				summary[(operation, phase)] = {**stats, 'histogram':list(stats['histogram']),
+												'mean':stats['total'] / stats['count'],
+												'p50':self.percentile(operation, phase, 50),
+												'p99':self.percentile(operation, phase, 99)}
+			return summary
+
+
+class Slow_Query_Logger:
+	'''
+	logs a warning for every event whose render and execute time add up to at least threshold seconds.
+	collector: an optional collector that also receives every event
+	'''
+	enabled = True
+
+	def __init__(self, threshold=0.1, logger=None, collector=None):
+		self.threshold = threshold
+		self.logger = logger or logging.getLogger('sql_query_templates.slow_query')
+		self.collector = collector
+
+	def record(self, event):
+		if self.collector is not None:
+			self.collector.record(event)
+		if event.render_time + event.execute_time >= self.threshold:
+			self.logger.warning('slow query: %s on %s took %.6fs (render %.6fs, execute %.6fs), %s rows, batch of %s',
+								event.operation, event.table, event.render_time + event.execute_time,
+								event.render_time, event.execute_time, event.row_count, event.batch_size)
+
+
+collector = Null_Collector()
+
+
+def set_collector(new_collector):
+	'''makes new_collector the active collector (None restores the no-op), returns it'''
+	global collector
+	collector = new_collector if new_collector is not None else Null_Collector()
+	return collector
+
+
+def emit(operation, table, render_time, execute_time, row_count=-1, batch_size=None):
+	collector.record(Query_Event(operation, table, render_time, execute_time, row_count, batch_size))
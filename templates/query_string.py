@@ -2,9 +2,33 @@
 Several pre defined query strings to use when interacting with an SQL database
 '''
 import os
-from jinja2 import Environment, FileSystemLoader, select_autoescape, Template
+from collections import OrderedDict
+from functools import wraps
+from templates import string_builder
 PATH = os.path.dirname(__file__)
-env = Environment(loader=FileSystemLoader(os.path.join(PATH, 'templates')))
+# jinja2 and its Environment are only loaded the first time a template is rendered, see _get_env
+_env = None
+
+# compiled templates are kept on disk so new processes skip parsing templates/templates.
+# SQL_TEMPLATES_CACHE_DIR overrides the location (jinja2 defaults to a per user temp dir),
+# an empty value turns the cache off
+BYTECODE_CACHE_DIR = os.environ.get('SQL_TEMPLATES_CACHE_DIR')
+
+# maximum number of rendered query strings kept by the builders below
+CACHE_SIZE = 1024
+
+# default SQLITE_MAX_VARIABLE_NUMBER of sqlite versions before 3.32 (newer ones allow 32766)
+SQLITE_MAX_VARIABLES = 999
+# larger multi row inserts don't get any faster, they only take longer to parse
+MAX_INSERT_ROWS = 500
+
+# INSERT OR <resolve> INTO, how sqlite handles a row that breaks a constraint
+RESOLVE = ('ROLLBACK', 'ABORT', 'FAIL', 'IGNORE', 'REPLACE')
+
+# 'jinja' renders the files in templates/templates, 
+# 'python' builds the same strings with templates/string_builder.py
+ENGINES = ('jinja', 'python')
+ENGINE = 'jinja'
 
 # =	Equal to
 # <> or !=	Not equal to
@@ -25,11 +49,177 @@ env = Environment(loader=FileSystemLoader(os.path.join(PATH, 'templates')))
 OPERATORS = ['=', '<>', '!=', '<', '>', '<=', '>=', 'ALL', 'AND', 'ANY', 'BETWEEN', 'EXISTS', 'IN', 'LIKE', 'NOT', 'OR']
 
 
+class _Query_Cache:
+	'''
+	A bounded LRU cache mapping the structural arguments of a builder
+	(table, fields, operators, order, limit, place holder, ...) to the rendered sql string
+	'''
+	def __init__(self, maxsize=CACHE_SIZE):
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self._data = OrderedDict()
+
+	def get(self, key):
+		try:
+			value = self._data[key]
+		except KeyError:
+			self.misses += 1
+			return None
+		self._data.move_to_end(key)
+		self.hits += 1
+		return value
+
+	def set(self, key, value):
+		if self.maxsize <= 0:
+			return
+		self._data[key] = value
+		self._data.move_to_end(key)
+		while len(self._data) > self.maxsize:
+			self._data.popitem(last=False)
+
+	def clear(self):
+		self._data.clear()
+		self.hits = 0
+		self.misses = 0
+
+	def info(self):
+		return {'hits':self.hits, 'misses':self.misses, 
+				'maxsize':self.maxsize, 'currsize':len(self._data)}
+
+
+_cache = _Query_Cache()
+
+
+class _Unhashable(Exception):
+	pass
+
+
+def _freeze(value):
+	'''
+	converts the arguments of a builder into a hashable key.
+	lists and tuples render the same, so they share a key, while dicts keep their item order.
+	anything else that is unhashable (sets, generators, ...) can't be used as a key
+	'''
+	kind = type(value)
+	if kind is str or value is None:
+		return value
+	if kind is tuple or kind is list:
+		return tuple(_freeze(item) for item in value)
+	if kind is dict:
+		return (dict, tuple((key, _freeze(item)) for key, item in value.items()))
+	if kind is int or kind is float or kind is bool:
+		# 1, 1.0 and True are equal keys but render differently
+		return (kind, value)
+	raise _Unhashable
+
+
+def _cached(f):
+	'''Decorator that memoizes the query string returned by a builder'''
+	@wraps(f)
+	def wrapper(*args, **kwargs):
+		try:
+			key = (f.__name__, _freeze(args), _freeze(sorted(kwargs.items())))
+		except _Unhashable:
+			return f(*args, **kwargs)
+		sql = _cache.get(key)
+		if sql is None:
+			sql = f(*args, **kwargs)
+			_cache.set(key, sql)
+		return sql
+	return wrapper
+
+
+def cache_info():
+	'''returns a dict with the hits, misses, maxsize and currsize of the query cache'''
+	return _cache.info()
+
+def cache_clear():
+	'''removes every cached query string and resets the hit/miss counters'''
+	_cache.clear()
+
+def set_cache_size(maxsize: int):
+	'''
+	maxsize: the maximum number of query strings to keep. 
+			 Use 0 to disable the cache
+	'''
+	_cache.maxsize = maxsize
+	while len(_cache._data) > max(maxsize, 0):
+		_cache._data.popitem(last=False)
+
+
+def _get_env():
+	'''builds the jinja2 Environment for templates/templates on first use'''
+	global _env
+	if _env is None:
+		from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+		bytecode_cache = None
+		if BYTECODE_CACHE_DIR is None:
+			bytecode_cache = FileSystemBytecodeCache()
+		elif BYTECODE_CACHE_DIR:
+			os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+			bytecode_cache = FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+		# the cache stores a checksum of each template's source,
+		# so an edited template is recompiled instead of loaded from disk
+		_env = Environment(loader=FileSystemLoader(os.path.join(PATH, 'templates')),
+							bytecode_cache=bytecode_cache)
+	return _env
+
+def set_bytecode_cache(directory):
+	'''
+	directory: where compiled templates are stored, '' disables the on disk cache
+			   and None uses jinja2's default temp directory
+	'''
+	global _env, BYTECODE_CACHE_DIR
+	BYTECODE_CACHE_DIR = directory
+	_env = None
+
+def precompile_templates():
+	'''
+	compiles every template in templates/templates and writes it to the bytecode cache.
+	call it before forking workers so they start with warm templates
+	returns the names of the compiled templates
+	'''
+	env = _get_env()
+	names = env.list_templates(extensions=['txt'])
+	for name in names:
+		env.get_template(name)
+	return names
+
+def __getattr__(name):
+	# keeps query_string.env working without building it at import time
+	if name == 'env':
+		return _get_env()
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def set_engine(engine: str):
+	'''engine: one of ENGINES, used by every builder that isn't passed an explicit engine'''
+	global ENGINE
+	ENGINE = _check_engine(engine)
+
+def _check_engine(engine):
+	if engine is None:
+		return ENGINE
+	if engine not in ENGINES:
+		raise ValueError(f'engine must be one of {ENGINES}')
+	return engine
+
+
 def all_sqlite_tables():
 	return "SELECT name FROM sqlite_master WHERE type='table';"
 
+def all_postgres_tables():
+	return "SELECT table_name FROM information_schema.tables WHERE table_schema = current_schema();"
+
+def postgres_table_fields(place_holder='%s'):
+	return ('SELECT column_name, data_type, is_nullable, column_default FROM information_schema.columns '
+			f'WHERE table_schema = current_schema() AND table_name = {place_holder} ORDER BY ordinal_position;')
+
+@_cached
 def select(table: str, fields, search_condition=None, operator=('=',),logic_operator=('AND',), 
-			order_by=None, order=None, having=None, place_holder='?', limit=None, subquery=None):
+			order_by=None, order=None, having=None, place_holder='?', limit=None, subquery=None, 
+			seek=False, engine=None):
 	'''
 	table_name: name of the db table to search or name of a subquery
 	fields: an iterable with the db fields for the given table
@@ -44,53 +234,186 @@ def select(table: str, fields, search_condition=None, operator=('=',),logic_oper
 	place_holder: symbol to use to represent the placeholder variable in the sql string
 	limit: a dict {'limit': _, 'offset': _}, where each value is an integer
 	subquery: a string representing a nested query string.
+	seek: keyset pagination, only return the rows that come after a given key in the order_by order.
+			adds (order_by fields) > (place holders) to the WHERE clause, or < when the order is DESC
+			ex) WHERE (k1, k2) > (?, ?) ORDER BY k1, k2 LIMIT 100
+			bind the order_by values of the last row of the previous page after the search_condition values.
+			every field in order_by must be ordered the same way
+	engine: 'jinja' or 'python', defaults to ENGINE
 	'''
-	temp = env.get_template('select.txt')
+	seek_op = _seek_operator(order_by, order) if seek else None
+	if _check_engine(engine) == 'python':
+		return string_builder.select(table, fields, search_condition, operator, logic_operator,
+									order_by, order, place_holder, limit, subquery, seek_op)
+	temp = _get_env().get_template('select.txt')
 	return temp.render(table_name=table, fields=fields, condition=search_condition,
 						operator=operator, logic_operator=logic_operator, 
 						order_by=order_by, order=order, having=having, p=place_holder, 
-						limit=limit, subquery=subquery)
+						limit=limit, subquery=subquery, seek=seek_op)
+
+def _seek_operator(order_by, order):
+	'''the comparison used by a keyset (seek) page: > for ascending keys and < for descending ones'''
+	if not order_by:
+		raise ValueError('seek requires the order_by fields that make up the key')
+	order = list(order or ())
+	directions = {(order[i] if i < len(order) and order[i] else 'ASC').upper() for i in range(len(order_by))}
+	if len(directions) != 1 or not directions <= {'ASC', 'DESC'}:
+		raise ValueError("seek requires every order_by field to be ordered the same way, 'ASC' or 'DESC'")
+	return '<' if directions == {'DESC'} else '>'
 
-def foreign_key(foreign_table, foreign_key):
-	temp = env.get_template('foreign_key.txt')
+@_cached
+def foreign_key(foreign_table, foreign_key, engine=None):
+	if _check_engine(engine) == 'python':
+		return string_builder.foreign_key(foreign_table, foreign_key)
+	temp = _get_env().get_template('foreign_key.txt')
 	return temp.render(f_table=foreign_table, f_key=foreign_key)
 
-def create_table(table_name: str, values: list):
+@_cached
+def create_table(table_name: str, values: list, engine=None):
 	'''
 	values: a list of dicts like [{'field':_, 'data_type':_, 'extra':_}, ...]
 		where field is a db column,
 		      data_type: is one of NULL, INTEGER, REAL, TEXT, BLOB
 			  extra: is an sql identifier PRIMARY KEY, or NOT NULL
 	'''
-	temp = env.get_template('create_table.txt')
+	if _check_engine(engine) == 'python':
+		return string_builder.create_table(table_name, values)
+	temp = _get_env().get_template('create_table.txt')
 	return temp.render(table_name=table_name, values=values)
 
-def insert_into(table_name: str, values: list, place_holder='?'):
-	temp = env.get_template('insert_into.txt')
-	return temp.render(table_name=table_name, values=values, p=place_holder)
+@_cached
+def insert_into(table_name: str, values: list, place_holder='?', rows=1, on_conflict=None, 
+				update_fields=None, resolve=None, engine=None):
+	'''
+	values: the fields to insert into
+	rows: number of rows inserted by the statement, VALUES (?, ?), (?, ?), ...
+		  see rows_per_insert for the most rows that fit in a single statement
+	on_conflict: upsert, the fields of a UNIQUE or PRIMARY KEY constraint ex) ('id',)
+				 an empty tuple matches any constraint (DO NOTHING only before sqlite 3.35)
+	update_fields: with on_conflict, the fields overwritten with the new row's values
+				   ON CONFLICT (id) DO UPDATE SET name = excluded.name, 
+				   when empty the new row is skipped: ON CONFLICT (id) DO NOTHING
+	resolve: sqlite's conflict resolution, one of RESOLVE ex) 'REPLACE' ---> INSERT OR REPLACE INTO
+	'''
+	if resolve is not None and resolve not in RESOLVE:
+		raise ValueError(f'resolve must be one of {RESOLVE}')
+	if update_fields and on_conflict is None:
+		raise ValueError('update_fields requires on_conflict')
+	if _check_engine(engine) == 'python':
+		return string_builder.insert_into(table_name, values, place_holder, rows, 
+										on_conflict, update_fields, resolve)
+	temp = _get_env().get_template('insert_into.txt')
+	return temp.render(table_name=table_name, values=values, p=place_holder, rows=rows, 
+						on_conflict=on_conflict, update_fields=update_fields, resolve=resolve)
+
+def rows_per_insert(field_count: int, max_variables=SQLITE_MAX_VARIABLES, max_rows=MAX_INSERT_ROWS):
+	'''
+	the most rows a multi row insert_into can hold without going over
+	max_variables place holders (sqlite's SQLITE_MAX_VARIABLE_NUMBER) or max_rows rows
+	'''
+	return max(1, min(max_variables // max(field_count, 1), max_rows))
 
 
-def update_table(table: str, fields, update_field: str, place_holder='?'):
+@_cached
+def update_table(table: str, fields, update_field: str, place_holder='?', engine=None):
 	'''fields an iterable (list or tuple) that contains the fields to update
 		update_field: field that goes after the WHERE clause
 	'''
-	temp = env.get_template('update_table.txt')
+	if _check_engine(engine) == 'python':
+		return string_builder.update_table(table, fields, update_field, place_holder)
+	temp = _get_env().get_template('update_table.txt')
 	return temp.render(table=table, fields=fields, 
 						update_field=update_field, p=place_holder)
+
+@_cached
+def update_from(table: str, fields, update_field: str, source: str, join=True, engine=None):
+	'''
+	set based update of table from the rows of another table (ex a temp table) with the same fields
+	fields: the fields to update
+	update_field: the key shared by table and source
+	join: UPDATE ... FROM source WHERE table.key = source.key, needs sqlite 3.33+ or postgres.
+		  when False the values are read with correlated subqueries, which older sqlite versions run
+	'''
+	if _check_engine(engine) == 'python':
+		return string_builder.update_from(table, fields, update_field, source, join)
+	temp = _get_env().get_template('update_from.txt')
+	return temp.render(table=table, fields=fields, update_field=update_field, 
+						source=source, join=join)
 	
-def drop_table(table: str):
-	return Template('DROP TABLE {{table}};').render(table=table)
+# one line queries don't need jinja2, they are compiled once into str.format
+_drop_table = 'DROP TABLE {if_exists}{table};'.format
+_table_fields = 'PRAGMA table_info({table});'.format
+
+_create_index = 'CREATE {unique}INDEX IF NOT EXISTS {name} ON {table} ({fields});'.format
+_drop_index = 'DROP INDEX IF EXISTS {name};'.format
+_explain = 'EXPLAIN QUERY PLAN {sql}'.format
+
+_delete_in = 'DELETE FROM {table} WHERE {field} IN ({place_holders});'.format
+
+_copy_from = 'COPY {table} ({fields}) FROM STDIN WITH (FORMAT csv);'.format
+_copy_to = 'COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER {header});'.format
+
+def copy_from(table: str, fields):
+	'''postgres COPY that reads csv rows for fields from STDIN'''
+	return _copy_from(table=table, fields=', '.join(fields))
+
+def copy_to(sql: str, header=True):
+	'''postgres COPY that writes the rows of a query to STDOUT as csv, sql can't have place holders'''
+	return _copy_to(sql=sql.rstrip().rstrip(';'), header='true' if header else 'false')
+
+def drop_table(table: str, if_exists=False):
+	return _drop_table(table=table, if_exists='IF EXISTS ' if if_exists else '')
 
 
 def table_fields(table: str):
-	return Template('PRAGMA table_info({{table}});').render(table=table)
+	return _table_fields(table=table)
 
-def delete_field(table: str):
-	# General form: DELETE FROM table WHERE search_condition;
-	# (optional additions) ORDER BY criteria LIMIT row_count OFFSET offset;
-	pass
+def index_name(table: str, fields):
+	'''default index name ex) ('age', 'name DESC') ---> table_age_name_idx'''
+	return '_'.join([table] + [field.split()[0] for field in fields] + ['idx'])
+
+def create_index(table: str, fields, name=None, unique=False):
+	'''
+	fields: the indexed fields, each one can be followed by ASC or DESC ex) ('age', 'name DESC')
+	name: defaults to index_name(table, fields)
+	unique: create a UNIQUE index
+	'''
+	return _create_index(unique='UNIQUE ' if unique else '', name=name or index_name(table, fields), 
+						table=table, fields=', '.join(fields))
+
+def drop_index(name: str):
+	return _drop_index(name=name)
+
+def explain(sql: str):
+	'''sqlite's EXPLAIN QUERY PLAN of a query string'''
+	return _explain(sql=sql)
+
+@_cached
+def delete_field(table: str, search_condition=None, operator=('=',), logic_operator=('AND',), 
+					order_by=None, order=None, place_holder='?', limit=None, between=None, engine=None):
+	'''
+	DELETE FROM table WHERE search_condition ORDER BY order_by LIMIT limit;
+	table, search_condition, operator, logic_operator, order_by, order, place_holder, limit: like select
+			ORDER BY and LIMIT only work when sqlite is compiled with SQLITE_ENABLE_UPDATE_DELETE_LIMIT
+	between: a field to restrict to a range of values, adds (search_condition) AND field BETWEEN ? AND ?
+			ex) between='rowid' to purge a large table one range of rows at a time
+			bind the low and high values after the search_condition values
+	engine: 'jinja' or 'python', defaults to ENGINE
+	'''
+	if _check_engine(engine) == 'python':
+		return string_builder.delete(table, search_condition, operator, logic_operator,
+									order_by, order, place_holder, limit, between)
+	temp = _get_env().get_template('delete.txt')
+	return temp.render(table_name=table, condition=search_condition, operator=operator, 
+						logic_operator=logic_operator, order_by=order_by, order=order, 
+						p=place_holder, limit=limit, between=between)
 
+@_cached
+def delete_in(table: str, field: str, count: int, place_holder='?'):
+	'''DELETE FROM table WHERE field IN (?, ?, ...); with count place holders'''
+	return _delete_in(table=table, field=field, place_holders=', '.join([place_holder] * count))
 
+#templates is a package, run this from the top level directory with python -m templates.query_string
 if __name__ == '__main__':
 	print(update_table('test', ['name'], 'id'))
 	print(select('test', ('id','name')))
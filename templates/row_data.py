@@ -0,0 +1,100 @@
+'''
+Checks and conversions of the fields and rows handed to insert_into, insert_stream and create_table.
+They don't depend on the database, so Sqlite_Connection and Postgres_Connection share them.
+'''
+from itertools import islice, chain, compress, count, repeat
+from operator import ne
+
+# number of invalid rows listed when insert_into rejects data
+MAX_ROW_ERRORS = 10
+# rows checked at a time by insert_into's validation
+VALIDATION_CHUNK = 65536
+# values of a numpy column converted to python objects at a time by insert_into(data_dict=...)
+TOLIST_CHUNK = 65536
+
+
+def convert_tuple_to_dict(fields):
+	'''fields: a list of tuples, where the first index of each tuple is a table field
+				the second index is the data type, and the
+				(optional) third index includes any other info like 'NOT NULL or PRIMARY KEY'
+				ex) [('age', 'INTEGER', 'NOT NULL'), ('name', 'TEXT'), ...]
+	'''
+	new_list = []
+	for item in fields:
+		if len(item) == 2:
+			new_list.append({'field':item[0], 'data_type':item[1]})
+		elif len(item) == 3:
+			new_list.append({'field':item[0], 'data_type':item[1], 'extra':item[2]})
+		else:
+			raise ValueError('Ensure that each tuple containse 2-3 elements (field, data_type, extra)')
+	return new_list
+
+
+def valid_field_data(fields, data, max_errors=MAX_ROW_ERRORS):
+	'''
+	cheks that fields and data are the appropriate type before using them
+	this does not check that types match up with the db schema
+	max_errors: the number of invalid rows listed in the error message
+	'''
+	if (type(fields) != tuple) or (type(data) != tuple and type(data) != list):
+		raise TypeError('fields must be a tupel, while data can be a tuple or a list of tuples')
+	if type(data) == tuple:
+		if len(fields) != len(data):
+			raise ValueError('Each field must correspond with a single data point')
+	elif not data:
+		raise TypeError('Data can be a tuple or a list of tuples')
+	else:
+		#map, set, compress and islice run in C, so rows are checked without a python level loop.
+		#checking VALIDATION_CHUNK rows at a time stops at the first chunk with an invalid row
+		width = len(fields)
+		for start in range(0, len(data), VALIDATION_CHUNK):
+			chunk = data[start:start + VALIDATION_CHUNK]
+			if set(map(type, chunk)) != {tuple}:
+				raise TypeError('Data can be a tuple or a list of tuples')
+			if set(map(len, chunk)) != {width}:
+				#indexes of the first max_errors + 1 rows with the wrong length, from this chunk on
+				lengths = map(len, islice(data, start, None))
+				invalid = list(islice(compress(count(start), map(ne, lengths, repeat(width))), max_errors + 1))
+				errors = [f'\nrow {i} has {width} feild(s) and {len(data[i])} inputs' for i in invalid[:max_errors]]
+				if len(invalid) > max_errors:
+					errors.append(f'\n... stopped after {max_errors} invalid rows')
+				raise ValueError(''.join(errors))
+	return fields, data
+
+
+def validate_rows(fields, rows):
+	'''lazily checks that every row is a tuple with one value per field'''
+	width = len(fields)
+	for i, row in enumerate(rows):
+		if type(row) != tuple:
+			raise TypeError(f'row {i} is a {type(row).__name__}, rows must be tuples')
+		if len(row) != width:
+			raise ValueError(f'row {i} has {width} feild(s) and {len(row)} inputs')
+		yield row
+
+
+def dict_to_rows(data: dict):
+	'''
+	data: a dict of field, value pairs: {field1: [value1, value2, value3, ...], field2:...}
+			where each field is a sequence of values (list, tuple, array.array, numpy array, ...)
+	returns the fields and an iterator that zips the columns into row tuples
+	'''
+	fields = tuple(data.keys())
+	columns = []
+	#check that all the fields are the same length:
+	for field in fields:
+		column = data[field]
+		if len(column) != len(data[fields[0]]):
+			raise ValueError('Ensure that each field has a list of data of the same lenght')
+		# numpy scalars can't be bound by the db drivers, tolist converts them to python objects.
+		# a slice at a time, so the whole column is never copied into a list
+		if hasattr(column, 'dtype'):
+			column = _tolist_chunks(column)
+		columns.append(column)
+	return fields, zip(*columns)
+
+
+def _tolist_chunks(column):
+	'''the values of a numpy column as python objects, TOLIST_CHUNK values at a time'''
+	return chain.from_iterable(column[start:start + TOLIST_CHUNK].tolist()
+								for start in range(0, len(column), TOLIST_CHUNK))
@@ -0,0 +1,188 @@
+'''
+Pure python versions of the query strings in templates/templates.
+Each function builds the exact same string as its jinja2 template using plain string joins,
+so query_string can skip jinja2 rendering entirely.
+'''
+
+
+class _Undefined:
+	'''stands in for jinja2's Undefined: renders as an empty string and is falsy'''
+	def __str__(self):
+		return ''
+
+	def __bool__(self):
+		return False
+
+
+UNDEFINED = _Undefined()
+
+
+def _item(seq, index):
+	'''seq[index] the way jinja2 looks it up, Undefined when it doesn't exist'''
+	try:
+		return seq[index]
+	except (TypeError, LookupError):
+		return UNDEFINED
+
+
+def _attr(obj, name):
+	'''obj.name the way jinja2 looks it up: attribute first, then item'''
+	try:
+		return getattr(obj, name)
+	except AttributeError:
+		pass
+	try:
+		return obj[name]
+	except (TypeError, LookupError):
+		return UNDEFINED
+
+
+def operators(condition, operator, logic_operator, p):
+	'''operators.txt'''
+	sql = []
+	condition = list(condition)
+	last = len(condition) - 1
+	for i, value in enumerate(condition):
+		op = _item(operator, i)
+		if op in ('=', '<>', '!=', '<', '>', '<=', '>=', 'IN', 'LIKE'):
+			sql.append(f'{value} {op} {p}')
+		if op == 'BETWEEN':
+			sql.append(f'{value} {op} {p} AND {p}')
+		if i != last:
+			sql.append(f' {_item(logic_operator, i)} ')
+	return ''.join(sql)
+
+
+def order_by(order_by, order):
+	'''order_by.txt'''
+	sql = []
+	for i, field in enumerate(order_by):
+		direction = _item(order, i)
+		sql.append(f'{field} {direction}' if direction else f'{field}')
+	return ', '.join(sql)
+
+
+def limit(limit):
+	'''limit.txt'''
+	count = _attr(limit, 'limit')
+	offset = _attr(limit, 'offset')
+	if count and offset:
+		return f'{count} OFFSET {offset}'
+	return f'{count}'
+
+
+def seek(order_by, seek, p):
+	'''seek.txt'''
+	if len(order_by) > 1:
+		fields = ', '.join(str(field) for field in order_by)
+		place_holders = ', '.join(f'{p}' for _ in order_by)
+		return f'({fields}) {seek} ({place_holders})'
+	return f'{order_by[0]} {seek} {p}'
+
+
+def select(table_name, fields, condition=None, operator=('=',), logic_operator=('AND',),
+			order_by_=None, order=None, p='?', limit_=None, subquery=None, seek_=None):
+	'''select.txt'''
+	sql = ['SELECT ']
+	fields = [str(item) for item in fields]
+	if fields:
+		sql.append(', '.join(fields))
+		sql.append(' ')
+	sql.append('FROM ')
+	if subquery:
+		sql.append(f'({subquery}) ')
+	sql.append(f'{table_name}')
+	if condition and seek_:
+		sql.append(f' WHERE ({operators(condition, operator, logic_operator, p)}) AND ')
+		sql.append(seek(order_by_, seek_, p))
+	elif condition:
+		sql.append(' WHERE ')
+		sql.append(operators(condition, operator, logic_operator, p))
+	elif seek_:
+		sql.append(' WHERE ')
+		sql.append(seek(order_by_, seek_, p))
+	if order_by_:
+		sql.append(' ORDER BY ')
+		sql.append(order_by(order_by_, order))
+	if limit_:
+		sql.append(' LIMIT ')
+		sql.append(limit(limit_))
+	sql.append(';')
+	return ''.join(sql)
+
+
+def delete(table_name, condition=None, operator=('=',), logic_operator=('AND',),
+			order_by_=None, order=None, p='?', limit_=None, between=None):
+	'''delete.txt'''
+	sql = [f'DELETE FROM {table_name}']
+	if condition and between:
+		sql.append(f' WHERE ({operators(condition, operator, logic_operator, p)}) AND ')
+		sql.append(f'{between} BETWEEN {p} AND {p}')
+	elif condition:
+		sql.append(' WHERE ')
+		sql.append(operators(condition, operator, logic_operator, p))
+	elif between:
+		sql.append(f' WHERE {between} BETWEEN {p} AND {p}')
+	if order_by_:
+		sql.append(' ORDER BY ')
+		sql.append(order_by(order_by_, order))
+	if limit_:
+		sql.append(' LIMIT ')
+		sql.append(limit(limit_))
+	sql.append(';')
+	return ''.join(sql)
+
+
+def foreign_key(f_table, f_key):
+	'''foreign_key.txt'''
+	return f'FOREIGN KEY ({f_key}) REFERENCES {f_table} ({f_key})'
+
+
+def create_table(table_name, values):
+	'''create_table.txt'''
+	columns = []
+	for item in values:
+		column = f'{_attr(item, "field")} {_attr(item, "data_type")}'
+		extra = _attr(item, 'extra')
+		if extra:
+			column += f' {extra}'
+		columns.append(column)
+	return f'CREATE TABLE IF NOT EXISTS {table_name} ({", ".join(columns)});'
+
+
+def insert_into(table_name, values, p='?', rows=1, on_conflict=None, update_fields=None, resolve=None):
+	'''insert_into.txt'''
+	values = [str(item) for item in values]
+	place_holders = ', '.join(f'{p}' for _ in values)
+	rows = ', '.join(f'({place_holders})' for _ in range(rows))
+	resolve = f'OR {resolve} ' if resolve else ''
+	sql = [f'INSERT {resolve}INTO {table_name}({", ".join(values)}) VALUES {rows}']
+	if on_conflict is not None:
+		sql.append(' ON CONFLICT')
+		if on_conflict:
+			sql.append(f' ({", ".join(str(item) for item in on_conflict)})')
+		if update_fields:
+			sql.append(' DO UPDATE SET ')
+			sql.append(', '.join(f'{item} = excluded.{item}' for item in update_fields))
+		else:
+			sql.append(' DO NOTHING')
+	sql.append(';')
+	return ''.join(sql)
+
+
+def update_table(table, fields, update_field, p='?'):
+	'''update_table.txt'''
+	columns = ', '.join(f'{item} = {p}' for item in fields)
+	return f'UPDATE {table} SET {columns} WHERE {update_field} = {p}'
+
+
+def update_from(table, fields, update_field, source, join=True):
+	'''update_from.txt'''
+	if join:
+		columns = ', '.join(f'{item} = {source}.{item}' for item in fields)
+		return (f'UPDATE {table} SET {columns} FROM {source} '
+				f'WHERE {table}.{update_field} = {source}.{update_field};')
+	columns = ', '.join(str(item) for item in fields)
+	return (f'UPDATE {table} SET ({columns}) = (SELECT {columns} FROM {source} '
+			f'WHERE {source}.{update_field} = {table}.{update_field}) '
+			f'WHERE {update_field} IN (SELECT {update_field} FROM {source});')
@@ -0,0 +1,70 @@
+import os
+import sys
+#adds the top level directory to the path
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(path)
+
+import logging
+import pytest
+from templates import instrumentation
+from sqlite_db.sqlite_script import Sqlite_Connection
+
+
+class Recorder:
+	enabled = True
+
+	def __init__(self):
+		self.events = []
+
+	def record(self, event):
+		self.events.append(event)
+
+
+@pytest.fixture(scope='function')
+def collector(request):
+	def use(new_collector):
+		return instrumentation.set_collector(new_collector)
+	request.addfinalizer(lambda: instrumentation.set_collector(None))
+	return use
+
+
+def test_default_is_disabled():
+	assert instrumentation.collector.enabled is False
+
+
+def test_connection_events(collector):
+	recorder = collector(Recorder())
+	with Sqlite_Connection(':memory:') as conn:
+		conn.create_table('test', [('id', 'INTEGER')])
+		conn.insert_into('test', ('id',), [(1,), (2,), (3,)])
+		list(conn.select('test'))
+	operations = [(event.operation, event.table, event.row_count, event.batch_size) for event in recorder.events]
+	assert operations == [('create_table', 'test', -1, 1), ('insert_into', 'test', 3, 3), ('select', 'test', -1, 1)]
+	assert all(event.render_time >= 0 and event.execute_time >= 0 for event in recorder.events)
+
+
+def test_histogram(collector):
+	histogram = collector(instrumentation.Histogram_Collector())
+	for seconds in (0.00001, 0.002, 0.002, 3):
+		instrumentation.emit('select', 'test', 0.0, seconds)
+	summary = histogram.summary()[('select', 'execute')]
+	assert summary['count'] == 4
+	assert summary['max'] == 3
+	assert summary['p50'] == 5e-3
+	assert summary['p99'] == 5.0
+	assert sum(summary['histogram']) == 4
+
+
+def test_slow_query_logger(collector, caplog):
+	histogram = instrumentation.Histogram_Collector()
+	collector(instrumentation.Slow_Query_Logger(threshold=0.5, collector=histogram))
+	with caplog.at_level(logging.WARNING):
+		instrumentation.emit('insert_into', 'fast', 0.1, 0.1, 10, 10)
+		instrumentation.emit('insert_into', 'slow', 0.1, 0.5, 10, 10)
+	assert len(caplog.records) == 1
+	assert 'slow query: insert_into on slow' in caplog.records[0].getMessage()
+	assert histogram.summary()[('insert_into', 'render')]['count'] == 2
+
+
+if __name__ == '__main__':
+	pytest.main()
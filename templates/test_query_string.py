@@ -1,5 +1,6 @@
 import os
 import sys
+import subprocess
 #adds the top level directory to the path
 path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(path)
@@ -8,6 +9,14 @@ import pytest
 import templates.query_string as qs
 
 
+@pytest.fixture(autouse=True, params=qs.ENGINES)
+def engine(request):
+	#every test runs against both the jinja templates and the pure python builders
+	qs.set_engine(request.param)
+	qs.cache_clear()
+	yield request.param
+	qs.set_engine('jinja')
+
 @pytest.fixture(scope='module')
 def new_values():
 	return [
@@ -198,6 +207,30 @@ class Test_Select_Limit:
 
 
 
+class Test_Select_Seek:
+	def test_single_key(self, test_fields):
+		query = qs.select(test_fields['table'], ('*',), order_by=('id',), limit={'limit':5}, seek=True)
+		assert query == 'SELECT * FROM test WHERE id > ? ORDER BY id LIMIT 5;'
+
+	def test_multi_key_desc(self, test_fields):
+		query = qs.select(test_fields['table'], ('*',), order_by=('age', 'id'), order=('DESC', 'desc'), 
+							limit={'limit':5}, seek=True)
+		assert query == 'SELECT * FROM test WHERE (age, id) < (?, ?) ORDER BY age DESC, id desc LIMIT 5;'
+
+	def test_with_condition(self, test_fields):
+		query = qs.select(test_fields['table'], ('*',), ('age', 'name'), operator=('>', '='), 
+							logic_operator=('OR',), order_by=('id',), limit={'limit':5}, seek=True)
+		assert query == 'SELECT * FROM test WHERE (age > ? OR name = ?) AND id > ? ORDER BY id LIMIT 5;'
+
+	def test_mixed_order(self, test_fields):
+		with pytest.raises(ValueError):
+			qs.select(test_fields['table'], ('*',), order_by=('age', 'id'), order=('ASC', 'DESC'), seek=True)
+
+	def test_requires_order_by(self, test_fields):
+		with pytest.raises(ValueError):
+			qs.select(test_fields['table'], ('*',), seek=True)
+
+
 @pytest.fixture(scope='module')
 def agregate():
 	def avg(val):
@@ -286,6 +319,34 @@ class Test_Insert_Into:
 		execute = qs.insert_into('test', ['id', 'name'], place_holder='%s')
 		assert execute == 'INSERT INTO test(id, name) VALUES (%s, %s);'
 
+	def test_multi_row(self):
+		execute = qs.insert_into('test', ['id', 'name'], rows=3)
+		assert execute == 'INSERT INTO test(id, name) VALUES (?, ?), (?, ?), (?, ?);'
+
+	def test_do_update(self):
+		value = qs.insert_into('tasks', ('id', 'name', 'priority'), on_conflict=('id',), update_fields=('name', 'priority'))
+		assert value == ('INSERT INTO tasks(id, name, priority) VALUES (?, ?, ?) '
+						'ON CONFLICT (id) DO UPDATE SET name = excluded.name, priority = excluded.priority;')
+
+	def test_do_nothing(self):
+		value = qs.insert_into('tasks', ('id', 'name'), place_holder='%s', rows=2, on_conflict=('id', 'name'))
+		assert value == 'INSERT INTO tasks(id, name) VALUES (%s, %s), (%s, %s) ON CONFLICT (id, name) DO NOTHING;'
+		value = qs.insert_into('tasks', ('id',), on_conflict=())
+		assert value == 'INSERT INTO tasks(id) VALUES (?) ON CONFLICT DO NOTHING;'
+
+	def test_resolve(self):
+		assert qs.insert_into('tasks', ('id',), resolve='REPLACE') == 'INSERT OR REPLACE INTO tasks(id) VALUES (?);'
+		with pytest.raises(ValueError):
+			qs.insert_into('tasks', ('id',), resolve='MERGE')
+		with pytest.raises(ValueError):
+			qs.insert_into('tasks', ('id',), update_fields=('id',))
+
+	def test_rows_per_insert(self):
+		assert qs.rows_per_insert(2) == 499
+		assert qs.rows_per_insert(1) == qs.MAX_INSERT_ROWS
+		assert qs.rows_per_insert(2000) == 1
+		assert qs.rows_per_insert(10, max_variables=32766, max_rows=10000) == 3276
+
 class Test_Update_Table:
 	def test_questing_placeholder(self):
 		value = qs.update_table('tasks', ('priority', 'begin_date', 'end_date'), 'id', place_holder='?')
@@ -296,8 +357,177 @@ class Test_Update_Table:
 		assert value == 'UPDATE tasks SET priority = %s, begin_date = %s, end_date = %s WHERE id = %s'
 
 
+class Test_Delete:
+	def test_all_rows(self):
+		assert qs.delete_field('tasks') == 'DELETE FROM tasks;'
+
+	def test_condition(self):
+		value = qs.delete_field('tasks', ('priority', 'name'), operator=('<', 'LIKE'), logic_operator=('OR',))
+		assert value == 'DELETE FROM tasks WHERE priority < ? OR name LIKE ?;'
+
+	def test_between(self):
+		assert qs.delete_field('tasks', between='rowid') == 'DELETE FROM tasks WHERE rowid BETWEEN ? AND ?;'
+		value = qs.delete_field('tasks', ('id', 'name'), operator=('>', '='), logic_operator=('OR',), between='rowid')
+		assert value == 'DELETE FROM tasks WHERE (id > ? OR name = ?) AND rowid BETWEEN ? AND ?;'
+
+	def test_order_by_limit(self):
+		value = qs.delete_field('tasks', ('priority',), operator=('<',), order_by=('id',), order=('DESC',),
+								limit={'limit':10}, place_holder='%s')
+		assert value == 'DELETE FROM tasks WHERE priority < %s ORDER BY id DESC LIMIT 10;'
+
+	def test_delete_in(self):
+		assert qs.delete_in('tasks', 'id', 3) == 'DELETE FROM tasks WHERE id IN (?, ?, ?);'
+		assert qs.delete_in('tasks', 'id', 1, place_holder='%s') == 'DELETE FROM tasks WHERE id IN (%s);'
+
+
+class Test_Update_From:
+	def test_join(self):
+		value = qs.update_from('tasks', ('priority', 'name'), 'id', 'temp.new_tasks')
+		assert value == ('UPDATE tasks SET priority = temp.new_tasks.priority, name = temp.new_tasks.name '
+						'FROM temp.new_tasks WHERE tasks.id = temp.new_tasks.id;')
+
+	def test_subquery(self):
+		value = qs.update_from('tasks', ('priority', 'name'), 'id', 'new_tasks', join=False)
+		assert value == ('UPDATE tasks SET (priority, name) = (SELECT priority, name FROM new_tasks '
+						'WHERE new_tasks.id = tasks.id) WHERE id IN (SELECT id FROM new_tasks);')
+
+
+class Test_Index:
+	def test_create(self):
+		assert qs.create_index('tasks', ('priority',)) == 'CREATE INDEX IF NOT EXISTS tasks_priority_idx ON tasks (priority);'
+
+	def test_create_unique_named(self):
+		value = qs.create_index('tasks', ('priority', 'name DESC'), name='by_priority', unique=True)
+		assert value == 'CREATE UNIQUE INDEX IF NOT EXISTS by_priority ON tasks (priority, name DESC);'
+
+	def test_index_name(self):
+		assert qs.index_name('tasks', ('priority', 'name DESC')) == 'tasks_priority_name_idx'
+
+	def test_drop(self):
+		assert qs.drop_index('tasks_priority_idx') == 'DROP INDEX IF EXISTS tasks_priority_idx;'
+
+
+def test_explain():
+	assert qs.explain('SELECT * FROM tasks;') == 'EXPLAIN QUERY PLAN SELECT * FROM tasks;'
+
 def test_drop_table():
 	assert qs.drop_table('test') == 'DROP TABLE test;'
+	assert qs.drop_table('test', if_exists=True) == 'DROP TABLE IF EXISTS test;'
+
+def test_copy_from():
+	assert qs.copy_from('test', ('id', 'name')) == 'COPY test (id, name) FROM STDIN WITH (FORMAT csv);'
+
+def test_copy_to():
+	assert qs.copy_to('SELECT id FROM test;') == 'COPY (SELECT id FROM test) TO STDOUT WITH (FORMAT csv, HEADER true);'
+	assert qs.copy_to('SELECT id FROM test', header=False).endswith('HEADER false);')
+
+
+class Test_Engine_Parity:
+	@pytest.mark.parametrize('kwargs', [
+		{'search_condition':('a', 'b'), 'operator':('=',)},
+		{'search_condition':('a', 'b', 'c'), 'operator':('ALL', 'BETWEEN', 'IN'), 'logic_operator':('OR',)},
+		{'order_by':('a', 'b'), 'order':('DESC',)},
+		{'limit':{'offset':3}},
+		{'limit':{'limit':5, 'offset':0}},
+		{'subquery':'SELECT id FROM other', 'search_condition':('id',)},
+		{'place_holder':None, 'search_condition':('id',)},
+	])
+	def test_select_edge_cases(self, kwargs):
+		jinja = qs.select('test', ('id', 'age'), engine='jinja', **kwargs)
+		python = qs.select('test', ('id', 'age'), engine='python', **kwargs)
+		assert jinja == python
+
+	def test_create_table_missing_keys(self):
+		values = [{'field':'id'}, {'data_type':'TEXT', 'extra':''}]
+		assert qs.create_table('t', values, engine='jinja') == qs.create_table('t', values, engine='python')
+
+	def test_empty_fields(self):
+		assert qs.select('t', (), engine='jinja') == qs.select('t', (), engine='python')
+		assert qs.insert_into('t', (), engine='jinja') == qs.insert_into('t', (), engine='python')
+
+	def test_unknown_engine(self):
+		with pytest.raises(ValueError):
+			qs.set_engine('mako')
+
+
+@pytest.mark.parametrize('engine', ['jinja'], indirect=True)
+def test_import_does_not_load_jinja(engine):
+	#runs in a fresh interpreter, the engine fixture has nothing to do with it so it runs once
+	code = 'import sys, templates.query_string as qs; qs.drop_table("t"); print("jinja2" in sys.modules)'
+	out = subprocess.run([sys.executable, '-c', code], cwd=path, capture_output=True, text=True)
+	assert out.stdout.strip() == 'False'
+
+
+class Test_Bytecode_Cache:
+	def teardown_method(self):
+		qs.set_bytecode_cache(os.environ.get('SQL_TEMPLATES_CACHE_DIR'))
+
+	def test_precompile_writes_cache(self, tmp_path):
+		qs.set_bytecode_cache(str(tmp_path))
+		names = qs.precompile_templates()
+		assert 'select.txt' in names
+		assert len(os.listdir(tmp_path)) == len(names)
+
+	def test_cached_templates_render(self, tmp_path):
+		qs.set_bytecode_cache(str(tmp_path))
+		qs.precompile_templates()
+		#a fresh environment loads the compiled templates from disk
+		qs.set_bytecode_cache(str(tmp_path))
+		assert qs.select('test', ('id',), ('age',), engine='jinja') == 'SELECT id FROM test WHERE age = ?;'
+
+	def test_disabled(self):
+		qs.set_bytecode_cache('')
+		assert qs.env.bytecode_cache is None
+
+
+class Test_Query_Cache:
+	def setup_method(self):
+		qs.cache_clear()
+
+	def teardown_method(self):
+		qs.set_cache_size(qs.CACHE_SIZE)
+
+	def test_repeated_shape_hits(self):
+		first = qs.select('test', ['id', 'age'], ('age',), operator=('>',), limit={'limit':5})
+		second = qs.select('test', ('id', 'age'), ['age'], operator=['>'], limit={'limit':5})
+		assert first == second == 'SELECT id, age FROM test WHERE age > ? LIMIT 5;'
+		assert qs.cache_info()['hits'] == 1
+		assert qs.cache_info()['misses'] == 1
+
+	def test_keyword_order_shares_key(self):
+		first = qs.select('test', ('id',), ('age',), operator=('>',), limit={'limit':5})
+		second = qs.select('test', ('id',), ('age',), limit={'limit':5}, operator=('>',))
+		assert first == second
+		assert qs.cache_info()['hits'] == 1
+
+	def test_place_holder_is_part_of_the_key(self):
+		assert qs.insert_into('test', ['id'], place_holder='?') == 'INSERT INTO test(id) VALUES (?);'
+		assert qs.insert_into('test', ['id'], place_holder='%s') == 'INSERT INTO test(id) VALUES (%s);'
+		assert qs.cache_info()['misses'] == 2
+
+	def test_equal_numbers_render_differently(self):
+		assert qs.select('test', ('*',), limit={'limit':True}) == 'SELECT * FROM test LIMIT True;'
+		assert qs.select('test', ('*',), limit={'limit':1}) == 'SELECT * FROM test LIMIT 1;'
+
+	def test_unhashable_arguments_bypass_the_cache(self):
+		query = qs.select('test', (field for field in ('id', 'age')))
+		assert query == 'SELECT id, age FROM test;'
+		assert qs.cache_info()['currsize'] == 0
+
+	def test_lru_eviction(self):
+		qs.set_cache_size(2)
+		qs.foreign_key('a', 'id')
+		qs.foreign_key('b', 'id')
+		qs.foreign_key('a', 'id')
+		qs.foreign_key('c', 'id')
+		assert qs.cache_info()['currsize'] == 2
+		qs.foreign_key('a', 'id')
+		assert qs.cache_info()['hits'] == 2
+
+	def test_clear(self):
+		qs.update_table('tasks', ('priority',), 'id')
+		qs.cache_clear()
+		assert qs.cache_info() == {'hits':0, 'misses':0, 'maxsize':qs.CACHE_SIZE, 'currsize':0}
 
 
 